@@ -0,0 +1,129 @@
+import datetime
+import gzip
+import itertools
+import json
+import logging
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+from app import database
+from app.models import CatalogEntry
+
+logger = logging.getLogger(__name__)
+
+# e.g movie_ids_05_15_2024.json.gz and tv_series_ids_05_15_2024.json.gz
+EXPORT_PATTERN = re.compile(
+    r"^(movie_ids|tv_series_ids)_(\d{2})_(\d{2})_(\d{4})\.json\.gz$",
+)
+EXPORT_TYPES = {"movie_ids": "movie", "tv_series_ids": "tv"}
+TITLE_KEYS = {"movie": "original_title", "tv": "original_name"}
+BATCH_SIZE = 5000
+SEARCH_LIMIT = 20
+
+
+def get_export_info(path):
+    """Return the media type and date of an export file from its name."""
+    match = EXPORT_PATTERN.match(Path(path).name)
+    if match is None:
+        msg = f"{Path(path).name} isn't a TMDB movie or TV ID export file"
+        raise ValueError(msg)
+
+    month, day, year = (int(part) for part in match.groups()[1:])
+    return EXPORT_TYPES[match[1]], datetime.date(year, month, day)
+
+
+def get_latest_exports(directory):
+    """Return the newest export file of each media type in the directory."""
+    latest = {}
+    for path in Path(directory).glob("*.json.gz"):
+        try:
+            media_type, export_date = get_export_info(path)
+        except ValueError:
+            continue
+        if media_type not in latest or export_date > latest[media_type][1]:
+            latest[media_type] = (path, export_date)
+    return [path for path, _ in latest.values()]
+
+
+def read_export(path):
+    """Yield the entries of a gzipped JSON lines export, one line at a time."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def import_export(path):
+    """Import an export file into the catalog and return the entries imported.
+
+    Entries missing from the export were deleted from TMDB and are removed.
+    """
+    media_type, export_date = get_export_info(path)
+    title_key = TITLE_KEYS[media_type]
+    entries = (
+        CatalogEntry(
+            media_id=entry["id"],
+            media_type=media_type,
+            title=entry[title_key][:255],
+            popularity=entry.get("popularity", 0),
+            adult=entry.get("adult", False),
+            export_date=export_date,
+        )
+        for entry in read_export(path)
+        if entry.get(title_key)
+    )
+
+    imported = 0
+    while batch := list(itertools.islice(entries, BATCH_SIZE)):
+        CatalogEntry.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["media_id", "media_type"],
+            update_fields=["title", "popularity", "adult", "export_date"],
+        )
+        imported += len(batch)
+
+    removed, _ = CatalogEntry.objects.filter(
+        media_type=media_type,
+        export_date__lt=export_date,
+    ).delete()
+
+    logger.info(
+        "Imported %s %s entries from %s, removed %s",
+        imported,
+        media_type,
+        Path(path).name,
+        removed,
+    )
+    return imported
+
+
+def search(media_type, query):
+    """Return the most popular catalog entries matching the query.
+
+    The results have the format of the TMDB search, without images as the
+    exports don't include them.
+    """
+    filters = {"media_type": media_type}
+    if not settings.TMDB_NSFW:
+        filters["adult"] = False
+
+    entries = database.search_titles(
+        CatalogEntry,
+        query,
+        filters,
+        SEARCH_LIMIT,
+        order_by="-popularity",
+    )
+    return [
+        {
+            "media_id": entry.media_id,
+            "source": "tmdb",
+            "media_type": media_type,
+            "title": entry.title,
+            "image": settings.IMG_NONE,
+        }
+        for entry in entries
+    ]
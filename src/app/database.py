@@ -1,4 +1,7 @@
+import re
+
 from django.apps import apps
+from django.db import connection
 from django.db.models import F
 
 from app import models
@@ -80,3 +83,92 @@ def get_media(media_type, item, user):
         return model.objects.get(**params)
     except model.DoesNotExist:
         return None
+
+
+# source of the items shown for each searched media type
+SEARCH_SOURCES = {
+    "tv": "tmdb",
+    "movie": "tmdb",
+    "anime": "mal",
+    "manga": "mal",
+    "game": "igdb",
+}
+LOCAL_SEARCH_LIMIT = 20
+
+
+def search_items(media_type, query, source=None):
+    """Return the known items with titles containing the words of the query.
+
+    Fast enough to run before the provider search.
+    """
+    source = source or SEARCH_SOURCES[media_type]
+    return search_titles(
+        Item,
+        query,
+        {"media_type": media_type, "source": source},
+        LOCAL_SEARCH_LIMIT,
+    )
+
+
+def search_titles(model, query, filters, limit, order_by=None):
+    """Return the objects with titles containing the words of the query.
+
+    Uses the title index of the model table, FTS5 on SQLite and trigrams on
+    PostgreSQL, created by migrations 0028 and 0029. Results are ordered by
+    relevance unless an order_by column is given, e.g -popularity.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return []
+
+    table = model._meta.db_table  # noqa: SLF001
+    conditions = [f"{table}.{column} = %s" for column in filters]
+    order = None
+    if order_by:
+        column = order_by.removeprefix("-")
+        order = f"{table}.{column} DESC" if order_by != column else f"{table}.{column}"
+
+    if connection.vendor == "sqlite":
+        # prefix query of every word, e.g "one"* "piec"*
+        match = " ".join(f'"{word}"*' for word in words)
+        return list(
+            model.objects.raw(
+                f"""
+                SELECT {table}.* FROM {table}_title_index
+                JOIN {table} ON {table}.id = {table}_title_index.rowid
+                WHERE {" AND ".join([f"{table}_title_index MATCH %s", *conditions])}
+                ORDER BY {order or f"{table}_title_index.rank"}
+                LIMIT %s
+                """,  # noqa: S608 only the placeholders are formatted
+                [match, *filters.values(), limit],
+            ),
+        )
+
+    if connection.vendor == "postgresql":
+        # words only contain the _ wildcard of the LIKE characters
+        patterns = ["%" + word.replace("_", r"\_") + "%" for word in words]
+        # the whole query is also matched by trigram similarity, for typos
+        matches = " AND ".join([f"{table}.title ILIKE %s"] * len(patterns))
+        return list(
+            model.objects.raw(
+                f"""
+                SELECT * FROM {table}
+                WHERE (({matches}) OR {table}.title %% %s)
+                AND {" AND ".join(conditions)}
+                ORDER BY {order or "similarity(title, %s) DESC"}
+                LIMIT %s
+                """,  # noqa: S608 only the placeholders are formatted
+                [
+                    *patterns,
+                    query,
+                    *filters.values(),
+                    *([] if order else [query]),
+                    limit,
+                ],
+            ),
+        )
+
+    objects = model.objects.filter(**filters)
+    for word in words:
+        objects = objects.filter(title__icontains=word)
+    return list(objects.order_by(order_by or "title")[:limit])
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import uuid
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# hosts of the provider images, the proxy doesn't fetch anything else
+IMAGE_HOSTS = {
+    "image.tmdb.org",
+    "cdn.myanimelist.net",
+    "images.igdb.com",
+    "cdn.mangaupdates.com",
+}
+# max width in pixels of each variant, about twice the displayed width
+VARIANTS = {"thumbnail": 80, "poster": 300, "still": 500}
+WEBP_QUALITY = 80
+MAX_DOWNLOAD_SIZE = 10 * 1024 * 1024  # bytes, larger originals aren't resized
+CHUNK_SIZE = 64 * 1024
+
+
+def is_proxied(url):
+    """Return whether the image URL is from a provider served by the proxy."""
+    url = urlsplit(url)
+    return url.scheme in ("http", "https") and url.hostname in IMAGE_HOSTS
+
+
+def get_path(url, variant):
+    """Return the disk cache path of the variant of the image."""
+    digest = hashlib.sha256(url.encode()).hexdigest()
+    return Path(settings.IMAGE_CACHE_DIR) / variant / digest[:2] / f"{digest}.webp"
+
+
+def get_variant(url, variant):
+    """Return the path of the WebP variant of the image, creating it on a miss.
+
+    Raises the RequestException or ValueError of the download, or the OSError
+    or DecompressionBombError of Pillow when the image can't be read.
+    """
+    path = get_path(url, variant)
+    if path.exists():
+        return path
+
+    width = VARIANTS[variant]
+    with Image.open(BytesIO(download(url))) as original:
+        # only shrinks, keeping the aspect ratio
+        original.thumbnail((width, width * 3))
+        image = original
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+        # written to a temporary file first so readers never see a partial image
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        image.save(temporary_path, "WEBP", quality=WEBP_QUALITY)
+        temporary_path.replace(path)
+
+    logger.info("Cached the %s variant of %s", variant, url)
+    return path
+
+
+def download(url):
+    """Return the content of the image, raise ValueError past MAX_DOWNLOAD_SIZE."""
+    response = requests.get(
+        url,
+        timeout=settings.PROVIDER_TIMEOUTS["default"]["background"],
+        stream=True,
+    )
+    try:
+        response.raise_for_status()
+        content = bytearray()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            content += chunk
+            if len(content) > MAX_DOWNLOAD_SIZE:
+                msg = f"{url} is larger than {MAX_DOWNLOAD_SIZE} bytes"
+                raise ValueError(msg)
+    finally:
+        response.close()
+    return bytes(content)
+
+
+def clean_cache():
+    """Delete the oldest cached images until the cache fits IMAGE_CACHE_SIZE.
+
+    Returns the number of files deleted, including temporary files left by
+    interrupted writes.
+    """
+    files = []
+    for path in Path(settings.IMAGE_CACHE_DIR).glob("*/*/*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    size = sum(file_size for _, file_size, _ in files)
+    max_size = settings.IMAGE_CACHE_SIZE * 1024 * 1024
+    deleted = 0
+    for _, file_size, path in sorted(files):
+        if size <= max_size:
+            break
+        path.unlink(missing_ok=True)
+        size -= file_size
+        deleted += 1
+
+    logger.info("Deleted %s cached images, %s bytes left", deleted, size)
+    return deleted
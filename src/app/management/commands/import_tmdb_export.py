@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import catalog
+
+
+class Command(BaseCommand):
+    """Import TMDB daily ID exports into the local catalog."""
+
+    help = (
+        "Import gzipped TMDB daily ID exports, e.g movie_ids_05_15_2024.json.gz, "
+        "into the catalog used when TMDB searches fail."
+    )
+
+    def add_arguments(self, parser):
+        """Add the export files argument."""
+        parser.add_argument("files", nargs="+", help="Movie or TV series export files")
+
+    def handle(self, *_args, **options):
+        """Import every export file."""
+        for path in options["files"]:
+            try:
+                imported = catalog.import_export(path)
+            except (ValueError, OSError) as error:
+                raise CommandError(error) from error
+            self.stdout.write(f"Imported {imported} entries from {path}")
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from app.providers.standin import StandInServer
+
+
+class Command(BaseCommand):
+    """Run a stand-in server for the provider APIs."""
+
+    help = (
+        "Serve recorded provider responses, point PROVIDER_BASE_URL at it. "
+        "With --record, requests are forwarded to the providers and saved."
+    )
+
+    def add_arguments(self, parser):
+        """Add the server options."""
+        parser.add_argument("fixtures", help="Directory of the recorded responses")
+        parser.add_argument(
+            "--record",
+            action="store_true",
+            help="Forward the requests to the providers and save their responses",
+        )
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0,
+            help="Average seconds added to every response",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            default=0,
+            help="Fraction of the requests answered with 429 Too Many Requests",
+        )
+        parser.add_argument(
+            "--retry-after",
+            type=int,
+            default=1,
+            help="Retry-After seconds of the 429 responses",
+        )
+
+    def handle(self, *_args, **options):
+        """Serve the fixtures until interrupted."""
+        server = StandInServer(
+            (options["host"], options["port"]),
+            options["fixtures"],
+            record=options["record"],
+            latency=options["latency"],
+            rate_limit=options["rate_limit"],
+            retry_after=options["retry_after"],
+        )
+        mode = "Recording" if options["record"] else "Replaying"
+        host, port = server.server_address[:2]
+        self.stdout.write(
+            f"{mode} provider responses in {options['fixtures']}, "
+            f"set PROVIDER_BASE_URL=http://{host}:{port}",
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from app.providers import caching, tmdb
+
+
+class Command(BaseCommand):
+    """Trim the episodes of the seasons cached with every episode field."""
+
+    help = (
+        "Keep only the used episode fields of the TMDB seasons cached before "
+        "they were trimmed, instead of waiting for them to expire."
+    )
+
+    def handle(self, *_args, **_options):
+        """Rewrite the cached seasons that still have unused episode fields."""
+        entries = {}
+        for key in caching.scan_cached_keys("season_*"):
+            entry = caching.load_entry(key, cache.get(key))
+            if entry is None:
+                continue
+            if not caching.is_entry(entry):
+                entry = {"data": entry, "fresh_until": 0}
+
+            episodes = entry["data"].get("episodes", [])
+            if any(episode.keys() - set(tmdb.EPISODE_FIELDS) for episode in episodes):
+                data = {**entry["data"], "episodes": tmdb.trim_episodes(episodes)}
+                entries[key] = {**entry, "data": data}
+
+        caching.store_entries(entries)
+        self.stdout.write(f"Trimmed the episodes of {len(entries)} cached seasons")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from app import warmup
+
+
+class Command(BaseCommand):
+    """Cache the metadata of every tracked media."""
+
+    help = (
+        "Fetch the metadata of the media tracked by any user, most recently "
+        "active first, resuming the last interrupted run."
+    )
+
+    def add_arguments(self, parser):
+        """Add the restart option."""
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start from the first media instead of resuming",
+        )
+
+    def handle(self, *_args, **options):
+        """Warm the metadata, reporting the progress after each batch."""
+        progress = warmup.warm_metadata(
+            restart=options["restart"],
+            on_progress=lambda progress: self.stdout.write(
+                f"{progress['done']}/{progress['total']} media, "
+                f"{progress['failed']} failed",
+            ),
+        )
+        self.stdout.write(
+            f"Warmed the metadata of {progress['total']} media, "
+            f"{progress['failed']} failed",
+        )
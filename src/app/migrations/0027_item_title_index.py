@@ -0,0 +1,81 @@
+from django.db import migrations
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE app_item_title_index USING fts5(
+        title,
+        content='app_item',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='3'
+    )
+    """,
+    # external content tables are kept up to date with triggers
+    """
+    CREATE TRIGGER app_item_title_index_insert AFTER INSERT ON app_item BEGIN
+        INSERT INTO app_item_title_index(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER app_item_title_index_delete AFTER DELETE ON app_item BEGIN
+        INSERT INTO app_item_title_index(app_item_title_index, rowid, title)
+        VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER app_item_title_index_update AFTER UPDATE OF title ON app_item BEGIN
+        INSERT INTO app_item_title_index(app_item_title_index, rowid, title)
+        VALUES ('delete', old.id, old.title);
+        INSERT INTO app_item_title_index(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    "INSERT INTO app_item_title_index(app_item_title_index) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS app_item_title_index_update",
+    "DROP TRIGGER IF EXISTS app_item_title_index_delete",
+    "DROP TRIGGER IF EXISTS app_item_title_index_insert",
+    "DROP TABLE IF EXISTS app_item_title_index",
+]
+
+POSTGRESQL_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX app_item_title_trgm ON app_item
+    USING gin (title gin_trgm_ops)
+    """,
+]
+POSTGRESQL_DROP = ["DROP INDEX IF EXISTS app_item_title_trgm"]
+
+
+def run_statements(schema_editor, statements_by_vendor):
+    """Run the statements of the database vendor, if it has any."""
+    for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_title_index(_, schema_editor):
+    """Create the title index of the items, FTS5 on SQLite, trigram on PostgreSQL."""
+    run_statements(
+        schema_editor,
+        {"sqlite": SQLITE_INDEX, "postgresql": POSTGRESQL_INDEX},
+    )
+
+
+def drop_title_index(_, schema_editor):
+    """Drop the title index of the items."""
+    run_statements(
+        schema_editor,
+        {"sqlite": SQLITE_DROP, "postgresql": POSTGRESQL_DROP},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0026_alter_anime_item_alter_game_item_alter_manga_item_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_title_index, drop_title_index),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE app_catalogentry_title_index USING fts5(
+        title,
+        content='app_catalogentry',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='3'
+    )
+    """,
+    """
+    CREATE TRIGGER app_catalogentry_title_index_insert
+    AFTER INSERT ON app_catalogentry BEGIN
+        INSERT INTO app_catalogentry_title_index(rowid, title)
+        VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER app_catalogentry_title_index_delete
+    AFTER DELETE ON app_catalogentry BEGIN
+        INSERT INTO app_catalogentry_title_index(
+            app_catalogentry_title_index, rowid, title
+        ) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER app_catalogentry_title_index_update
+    AFTER UPDATE OF title ON app_catalogentry BEGIN
+        INSERT INTO app_catalogentry_title_index(
+            app_catalogentry_title_index, rowid, title
+        ) VALUES ('delete', old.id, old.title);
+        INSERT INTO app_catalogentry_title_index(rowid, title)
+        VALUES (new.id, new.title);
+    END
+    """,
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS app_catalogentry_title_index_update",
+    "DROP TRIGGER IF EXISTS app_catalogentry_title_index_delete",
+    "DROP TRIGGER IF EXISTS app_catalogentry_title_index_insert",
+    "DROP TABLE IF EXISTS app_catalogentry_title_index",
+]
+
+POSTGRESQL_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX app_catalogentry_title_trgm ON app_catalogentry
+    USING gin (title gin_trgm_ops)
+    """,
+]
+POSTGRESQL_DROP = ["DROP INDEX IF EXISTS app_catalogentry_title_trgm"]
+
+
+def run_statements(schema_editor, statements_by_vendor):
+    """Run the statements of the database vendor, if it has any."""
+    for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_title_index(_, schema_editor):
+    """Create the title index of the catalog, like the one of the items."""
+    run_statements(
+        schema_editor,
+        {"sqlite": SQLITE_INDEX, "postgresql": POSTGRESQL_INDEX},
+    )
+
+
+def drop_title_index(_, schema_editor):
+    """Drop the title index of the catalog."""
+    run_statements(
+        schema_editor,
+        {"sqlite": SQLITE_DROP, "postgresql": POSTGRESQL_DROP},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0027_item_title_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('media_id', models.PositiveIntegerField()),
+                ('media_type', models.CharField(choices=[('movie', 'Movie'), ('tv', 'TV Show')], max_length=10)),
+                ('title', models.CharField(max_length=255)),
+                ('popularity', models.FloatField(default=0)),
+                ('adult', models.BooleanField(default=False)),
+                ('export_date', models.DateField()),
+            ],
+            options={
+                'unique_together': {('media_id', 'media_type')},
+            },
+        ),
+        migrations.RunPython(create_title_index, drop_title_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0028_catalogentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetadataSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('source', models.CharField(max_length=20)),
+                ('media_type', models.CharField(max_length=10)),
+                ('media_id', models.PositiveIntegerField()),
+                ('season_number', models.PositiveIntegerField(blank=True, null=True)),
+                ('data', models.JSONField()),
+                ('validators', models.JSONField(default=dict)),
+                ('fresh_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'media_type', 'media_id'], name='app_metadat_source_c5b90d_idx')],
+            },
+        ),
+    ]
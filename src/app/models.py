@@ -141,6 +141,58 @@ class Item(models.Model):
         return READABLE_MEDIA_TYPES[self.media_type]
 
 
+class CatalogEntry(models.Model):
+    """Model for the titles of the TMDB daily ID exports."""
+
+    media_id = models.PositiveIntegerField()
+    media_type = models.CharField(
+        max_length=10,
+        choices=[
+            (media_type, READABLE_MEDIA_TYPES[media_type])
+            for media_type in ["movie", "tv"]
+        ],
+    )
+    title = models.CharField(max_length=255)
+    popularity = models.FloatField(default=0)
+    adult = models.BooleanField(default=False)
+    # date of the export the entry was last seen in
+    export_date = models.DateField()
+
+    class Meta:
+        """Meta options for the model."""
+
+        unique_together = ["media_id", "media_type"]
+
+    def __str__(self):
+        """Return the title of the entry."""
+        return self.title
+
+
+class MetadataSnapshot(models.Model):
+    """Model for the processed provider metadata, kept behind the Redis cache."""
+
+    # the cache key, unique as null seasons aren't equal in unique constraints
+    key = models.CharField(max_length=255, unique=True)
+    source = models.CharField(max_length=20)
+    media_type = models.CharField(max_length=10)
+    media_id = models.PositiveIntegerField()
+    season_number = models.PositiveIntegerField(null=True, blank=True)
+    data = models.JSONField()
+    # ETag and Last-Modified of the provider response
+    validators = models.JSONField(default=dict)
+    fresh_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta options for the model."""
+
+        indexes = [models.Index(fields=["source", "media_type", "media_id"])]
+
+    def __str__(self):
+        """Return the cache key of the snapshot."""
+        return self.key
+
+
 class Media(models.Model):
     """Abstract model for all media types."""
 
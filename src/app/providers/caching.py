@@ -0,0 +1,480 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from unidecode import unidecode
+
+from app.providers import metrics, serializers, services, snapshots
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 60  # seconds a fetch can hold the lock before it expires
+WAIT_TIMEOUT = 10  # seconds to wait for another fetch before doing it ourselves
+POLL_INTERVAL = 0.1  # seconds between cache checks while waiting
+INVALIDATION_CHANNEL = "yamtrack:metadata_invalidation"
+ENTRY_KEYS = {"data", "fresh_until", "validators"}
+# kept fresh longer, the TMDB changes task marks them stale when they change
+TMDB_KEY_PREFIXES = {"movie", "tv", "season"}
+
+
+class LocalCache:
+    """Bounded in-process LRU cache in front of Redis.
+
+    Values are shared by every caller in the process, copy them before
+    modifying them.
+    """
+
+    def __init__(self, maxsize, ttl):
+        """Create an empty cache holding up to maxsize entries for ttl seconds."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value of the key or None if it's missing or expired."""
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None or item[1] < time.monotonic():
+                self.entries.pop(key, None)
+                return None
+            self.entries.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value):
+        """Store the value, evicting the least recently used entries if full."""
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove the key from the cache."""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache(
+    maxsize=settings.METADATA_LOCAL_SIZE,
+    ttl=settings.METADATA_LOCAL_TTL,
+)
+
+# identifies this process in invalidation messages, set when subscribing
+invalidation_state = {"pid": None, "sender": None}
+invalidation_lock = threading.Lock()
+
+
+def get_cache_client():
+    """Return the Redis client of the cache backend."""
+    return cache._cache.get_client(write=True)  # noqa: SLF001
+
+
+def scan_cached_keys(*patterns):
+    """Yield the cache keys matching the glob patterns."""
+    client = get_cache_client()
+    key_prefix = cache.make_key("")
+
+    for pattern in patterns:
+        for redis_key in client.scan_iter(match=f"{key_prefix}{pattern}"):
+            yield redis_key.decode().removeprefix(key_prefix)
+
+
+def subscribe_invalidations():
+    """Listen for keys changed by other processes and drop them locally."""
+    with invalidation_lock:
+        if invalidation_state["pid"] == os.getpid():
+            return
+
+        sender = uuid.uuid4().hex
+
+        def handle_message(message):
+            message_sender, _, key = message["data"].decode().partition(":")
+            if message_sender != sender:
+                local_cache.delete(key)
+
+        # entries cached before this process subscribed may have changed
+        local_cache.clear()
+        pubsub = services.get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATION_CHANNEL: handle_message})
+        pubsub.run_in_thread(sleep_time=1, daemon=True)
+        invalidation_state.update(pid=os.getpid(), sender=sender)
+
+
+def publish_invalidation(*keys):
+    """Tell the other processes to drop their local copy of the keys."""
+    subscribe_invalidations()
+    sender = invalidation_state["sender"]
+
+    pipe = services.get_redis().pipeline(transaction=False)
+    for key in keys:
+        pipe.publish(INVALIDATION_CHANNEL, f"{sender}:{key}")
+    pipe.execute()
+
+
+def get_or_fetch(key, fetch, *args):
+    """Return the cached metadata for the key, fetching it on a miss.
+
+    fetch(*args) can be a function or a coroutine function.
+    """
+    data = get_cached(key, fetch, *args)
+
+    if data is None:
+        data = single_flight(key, fetch, *args)
+
+    return data
+
+
+def get_cached(key, fetch, *args, from_database=True):
+    """Return the cached metadata for the key without fetching it on a miss.
+
+    Metadata past its soft TTL is still returned, but a background refresh
+    with fetch(*args) is queued. Without from_database, the snapshots aren't
+    read when Redis misses.
+    """
+    subscribe_invalidations()
+    entry = local_cache.get(key)
+    source = "local"
+
+    if entry is None:
+        entry = load_entry(key, cache.get(key))
+        source = "redis"
+        if entry is not None:
+            local_cache.set(key, entry)
+        else:
+            entry = snapshots.load_many([key]).get(key) if from_database else None
+            if entry is None:
+                metrics.record_cache_reads((key, "miss"))
+                return None
+            cache_entries({key: entry})
+            source = "database"
+
+    metrics.record_cache_reads((key, source))
+    return read_entry(key, entry, fetch, *args)
+
+
+def normalize_query(query):
+    """Return the query casefolded, with single spaces and accents removed.
+
+    Only Latin text is transliterated, other scripts would lose meaning.
+    """
+    query = " ".join(query.casefold().split())
+    if all(char.isascii() or is_latin(char) for char in query):
+        query = unidecode(query)
+    return query
+
+
+def is_latin(char):
+    """Return whether the character belongs to the Latin script."""
+    return unicodedata.name(char, "").startswith("LATIN")
+
+
+def get_search_key(prefix, normalized_query):
+    """Return the cache key of the search results of a normalized query."""
+    digest = hashlib.sha256(normalized_query.encode()).hexdigest()[:32]
+    return f"{prefix}_{digest}"
+
+
+def get_search(prefix, query):
+    """Return the cached search results of the query, None on a miss."""
+    return cache.get(get_search_key(prefix, normalize_query(query)))
+
+
+def set_search(prefix, query, results):
+    """Cache the search results of the query.
+
+    Empty results are kept for METADATA_NOT_FOUND_TTL.
+    """
+    timeout = DEFAULT_TIMEOUT if results else settings.METADATA_NOT_FOUND_TTL
+    cache.set(get_search_key(prefix, normalize_query(query)), results, timeout)
+
+
+def get_many_cached(fetchers):
+    """Return the cached metadata of many keys with a single Redis round trip.
+
+    fetchers maps each key to the (fetch, args) used to refresh it when stale,
+    missing keys are left out of the result.
+    """
+    subscribe_invalidations()
+    entries = {}
+    sources = dict.fromkeys(fetchers, "miss")
+
+    for key in fetchers:
+        entry = local_cache.get(key)
+        if entry is not None:
+            entries[key] = entry
+            sources[key] = "local"
+
+    remote_keys = [key for key in fetchers if key not in entries]
+    if remote_keys:
+        for key, value in cache.get_many(remote_keys).items():
+            entry = load_entry(key, value)
+            if entry is not None:
+                local_cache.set(key, entry)
+                entries[key] = entry
+                sources[key] = "redis"
+
+    # lost by Redis, e.g after a flush or a cache version change
+    restored = snapshots.load_many([key for key in remote_keys if key not in entries])
+    cache_entries(restored)
+    entries.update(restored)
+    sources.update(dict.fromkeys(restored, "database"))
+
+    metrics.record_cache_reads(*sources.items())
+
+    return {
+        key: read_entry(key, entry, fetchers[key][0], *fetchers[key][1])
+        for key, entry in entries.items()
+    }
+
+
+def load_entry(key, value):
+    """Return the entry of a value read from Redis."""
+    # entries cached before the metadata serializers were added aren't bytes
+    if isinstance(value, bytes):
+        return serializers.loads(key, value)
+    return value
+
+
+def read_entry(key, entry, fetch, *args):
+    """Return the metadata of a cached entry, queuing a refresh if stale."""
+    # entries cached before soft TTLs were added are plain metadata
+    if not is_entry(entry):
+        entry = {"data": entry, "fresh_until": 0}
+
+    if entry["fresh_until"] < time.time():
+        metrics.increment(
+            "metadata_cache_stale_total",
+            prefix=serializers.get_key_prefix(key),
+        )
+        schedule_refresh(key, fetch, *args)
+
+    return entry["data"]
+
+
+def set_cached(key, data, validators=None, *, stale=False):
+    """Store the metadata with its soft TTL, kept until the hard TTL expires.
+
+    validators are the ETag and Last-Modified of the provider response, used
+    to make the request conditional when refreshing it. Stale metadata is
+    refreshed the next time it's read.
+    """
+    set_many_cached(
+        {key: data},
+        {key: validators} if validators else None,
+        stale_keys={key} if stale else (),
+    )
+
+
+def set_many_cached(data_by_key, validators_by_key=None, stale_keys=()):
+    """Store the metadata of many keys with a single Redis round trip."""
+    if not data_by_key:
+        return
+
+    now = time.time()
+    entries = {
+        key: {
+            "data": data,
+            "fresh_until": 0 if key in stale_keys else now + get_soft_ttl(key),
+        }
+        for key, data in data_by_key.items()
+    }
+    for key, validators in (validators_by_key or {}).items():
+        entries[key]["validators"] = validators
+    store_entries(entries)
+
+
+def expire_cached(*keys):
+    """Mark the cached metadata of the keys as stale, refreshing it when read."""
+    entries = {}
+
+    for key, value in cache.get_many(keys).items():
+        entry = load_entry(key, value)
+        if entry is None:
+            continue
+        if not is_entry(entry):
+            entry = {"data": entry}
+        entries[key] = {**entry, "fresh_until": 0}
+
+    store_entries(entries)
+    return len(entries)
+
+
+def store_entries(entries):
+    """Write the entries to every cache level, telling other processes."""
+    if not entries:
+        return
+
+    cache_entries(entries)
+    snapshots.save_many(entries)
+    publish_invalidation(*entries)
+
+
+def cache_entries(entries):
+    """Write the entries to Redis and the local cache."""
+    if not entries:
+        return
+
+    serialized = {key: serializers.dumps(entry) for key, entry in entries.items()}
+    cache.set_many(serialized, settings.METADATA_HARD_TTL)
+    metrics.record_entry_sizes({key: len(data) for key, data in serialized.items()})
+
+    # subscribing clears the local cache, it would drop the entries set below
+    subscribe_invalidations()
+    for key, entry in entries.items():
+        local_cache.set(key, entry)
+
+
+def get_soft_ttl(key):
+    """Return the seconds the metadata of the key is served without a refresh."""
+    if serializers.get_key_prefix(key) in TMDB_KEY_PREFIXES:
+        return settings.METADATA_TMDB_SOFT_TTL
+    return settings.METADATA_SOFT_TTL
+
+
+def is_entry(value):
+    """Return whether the cached value has soft TTL information."""
+    return (
+        isinstance(value, dict)
+        and {"data", "fresh_until"} <= value.keys() <= ENTRY_KEYS
+    )
+
+
+def schedule_refresh(key, fetch, *args):
+    """Queue a refresh of the key, unless one is already queued."""
+    # the refresh task releases it, the timeout covers lost tasks
+    if acquire_lock(f"refresh:{cache.make_key(key)}", timeout=LOCK_TIMEOUT):
+        from app.tasks import refresh_metadata
+
+        logger.info("Metadata for %s is stale, queuing a refresh", key)
+        fetch_path = f"{fetch.__module__}.{fetch.__qualname__}"
+        refresh_metadata.delay(key, fetch_path, args)
+
+
+def single_flight(key, fetch, *args):
+    """Fetch and cache the metadata once across all processes.
+
+    The first caller takes a Redis lock and fills the cache, the others poll
+    the cache until it's filled or they can take the lock themselves.
+    """
+    lock_name = f"lock:{cache.make_key(key)}"
+    wait_timeout = WAIT_TIMEOUT
+    remaining = services.get_remaining_time()
+    if remaining is not None:
+        wait_timeout = min(wait_timeout, remaining)
+    deadline = time.monotonic() + wait_timeout
+
+    while time.monotonic() < deadline:
+        token = acquire_lock(lock_name)
+        if token:
+            try:
+                # filled by another caller while we were acquiring the lock,
+                # the snapshots were already read before calling this
+                data = get_cached(key, fetch, *args, from_database=False)
+                if data is None:
+                    data = fetch_and_set(key, fetch, *args)
+            finally:
+                release_lock(lock_name, token)
+            return data
+
+        time.sleep(POLL_INTERVAL)
+        data = get_cached(key, fetch, *args, from_database=False)
+        if data is not None:
+            return data
+
+    logger.warning("Timed out waiting for %s, fetching it without the lock", key)
+    return fetch_and_set(key, fetch, *args)
+
+
+def acquire_lock(name, timeout=LOCK_TIMEOUT):
+    """Try to take the lock, return its token if acquired."""
+    token = uuid.uuid4().hex
+    if services.get_redis().set(name, token, nx=True, ex=timeout):
+        return token
+    return None
+
+
+def release_lock(name, token):
+    """Release the lock if it's still owned by the token."""
+
+    def delete_if_owned(pipe):
+        if pipe.get(name) == token.encode():
+            pipe.multi()
+            pipe.delete(name)
+        else:
+            logger.warning("Lock %s expired before it was released", name)
+
+    services.get_redis().transaction(delete_if_owned, name)
+
+
+def refresh_cached(key, fetch, *args):
+    """Fetch the metadata again, conditionally if the cached entry allows it."""
+    entry = load_entry(key, cache.get(key))
+    return fetch_and_set(key, fetch, *args, entry=entry if is_entry(entry) else None)
+
+
+def fetch_and_set(key, fetch, *args, entry=None):
+    """Call the fetch function and store its result in the cache.
+
+    With the previous entry, its validators are sent with the request and the
+    entry is kept for another soft TTL if the provider reports no changes.
+    """
+    conditional = {"sent": entry.get("validators", {}) if entry else {}, "received": {}}
+    token = services.conditional_requests.set(conditional)
+    try:
+        data, complete = fetch_metadata(fetch, *args)
+    except services.NotModifiedError:
+        logger.info("Metadata for %s hasn't changed, extending it", key)
+        set_cached(key, entry["data"], entry["validators"])
+        return entry["data"]
+    finally:
+        services.conditional_requests.reset(token)
+
+    if not complete:
+        logger.info("Metadata for %s is incomplete, storing it stale", key)
+        set_cached(key, data, stale=True)
+        return data
+
+    # a 304 only means the whole metadata is unchanged if it came from one request
+    validators = None
+    if len(conditional["received"]) == 1 and all(conditional["received"].values()):
+        validators = conditional["received"]
+
+    set_cached(key, data, validators)
+    return data
+
+
+def fetch_metadata(fetch, *args):
+    """Call the fetch function, returning its result and whether it's complete.
+
+    Metadata is incomplete when some optional requests were skipped, e.g the
+    related series once the deadline is spent.
+    """
+    tracker = {"incomplete": False}
+    token = services.incomplete_fetch.set(tracker)
+    try:
+        data = call_fetch(fetch, *args)
+    finally:
+        services.incomplete_fetch.reset(token)
+    return data, not tracker["incomplete"]
+
+
+def call_fetch(fetch, *args):
+    """Call a fetch function or coroutine function and return its result."""
+    if asyncio.iscoroutinefunction(fetch):
+        return services.run_async(fetch(*args))
+    return fetch(*args)
@@ -0,0 +1,73 @@
+import logging
+
+import requests
+from django.conf import settings
+
+from app.providers import services
+
+logger = logging.getLogger(__name__)
+
+FAILURES_KEY = "circuit_failures:{provider}"
+OPEN_KEY = "circuit_open:{provider}"
+
+
+class ProviderUnavailableError(Exception):
+    """The provider is failing and its requests are skipped for a while."""
+
+    def __init__(self, provider, retry_after):
+        """Store the provider and the seconds until it's tried again."""
+        self.provider = provider
+        self.retry_after = retry_after
+        msg = f"{provider} is unavailable, retry in {retry_after:.0f} seconds"
+        super().__init__(msg)
+
+
+def check(provider):
+    """Raise ProviderUnavailableError if the circuit of the provider is open."""
+    milliseconds = services.get_redis().pttl(OPEN_KEY.format(provider=provider))
+    if milliseconds > 0:
+        raise ProviderUnavailableError(provider, milliseconds / 1000)
+
+
+def record_success(provider):
+    """Reset the failures of the provider."""
+    services.get_redis().delete(FAILURES_KEY.format(provider=provider))
+
+
+def record_error(provider, error):
+    """Count server errors as failures of the provider."""
+    if error.response.status_code >= requests.codes.server_error:
+        record_failure(provider)
+
+
+def record_failure(provider):
+    """Count a failure, opening the circuit after too many in the window."""
+    key = FAILURES_KEY.format(provider=provider)
+    redis = services.get_redis()
+
+    failures = redis.incr(key)
+    if failures == 1:
+        redis.expire(key, settings.CIRCUIT_BREAKER_WINDOW)
+
+    if failures >= settings.CIRCUIT_BREAKER_THRESHOLD:
+        open_circuit(provider)
+
+
+def open_circuit(provider):
+    """Skip the requests to the provider until the circuit timeout expires."""
+    timeout = settings.CIRCUIT_BREAKER_TIMEOUT
+    logger.error(
+        "%s is failing, skipping its requests for %s seconds",
+        provider,
+        timeout,
+    )
+
+    pipe = services.get_redis().pipeline()
+    pipe.set(OPEN_KEY.format(provider=provider), 1, ex=timeout)
+    # half open afterwards, the first failure opens it again
+    pipe.set(
+        FAILURES_KEY.format(provider=provider),
+        settings.CIRCUIT_BREAKER_THRESHOLD - 1,
+        ex=timeout + settings.CIRCUIT_BREAKER_WINDOW,
+    )
+    pipe.execute()
@@ -1,11 +1,25 @@
 from datetime import datetime
 
+import requests
 from django.conf import settings
 from django.core.cache import cache
 
-from app.providers import services
+from app.providers import caching, services
 
 base_url = "https://api.igdb.com/v4"
+MULTIQUERY_SIZE = 10  # queries answered by a multiquery request
+QUERY_LIMIT = 500  # games returned by a query
+GAME_FIELDS = (
+    "name,cover.image_id,summary,category,first_release_date,"
+    "genres.name,themes.name,platforms.name,involved_companies.company.name,"
+    "parent_game.name,parent_game.cover.image_id,"
+    "remasters.name,remasters.cover.image_id,"
+    "remakes.name,remakes.cover.image_id,"
+    "expansions.name,expansions.cover.image_id,"
+    "standalone_expansions.name,standalone_expansions.cover.image_id,"
+    "expanded_games.name,expanded_games.cover.image_id,"
+    "similar_games.name,similar_games.cover.image_id"
+)
 
 
 def get_access_token():
@@ -30,7 +44,7 @@ def get_access_token():
 
 def search(query):
     """Search for games on IGDB."""
-    data = cache.get(f"search_games_{query}")
+    data = caching.get_search("search_games", query)
     if data is None:
         access_token = get_access_token()
         url = f"{base_url}/games"
@@ -61,64 +75,111 @@ def search(query):
             }
             for media in response
         ]
-        cache.set(f"search_games_{query}", data)
+        caching.set_search("search_games", query, data)
     return data
 
 
 def game(media_id):
     """Return the metadata for the selected game from IGDB."""
-    data = cache.get(f"game_{media_id}")
-    if data is None:
-        access_token = get_access_token()
-        url = f"{base_url}/games"
-        data = (
-            "fields name,cover.image_id,summary,category,first_release_date,"
-            "genres.name,themes.name,platforms.name,involved_companies.company.name,"
-            "parent_game.name,parent_game.cover.image_id,"
-            "remasters.name,remasters.cover.image_id,"
-            "remakes.name,remakes.cover.image_id,"
-            "expansions.name,expansions.cover.image_id,"
-            "standalone_expansions.name,standalone_expansions.cover.image_id,"
-            "expanded_games.name,expanded_games.cover.image_id,"
-            "similar_games.name,similar_games.cover.image_id;"
-            f"where id = {media_id};"
+    return caching.get_or_fetch(f"game_{media_id}", fetch_game, media_id)
+
+
+def fetch_game(media_id):
+    """Request and process the metadata for a game from IGDB."""
+    url = f"{base_url}/games"
+    data = f"fields {GAME_FIELDS};where id = {media_id};"
+    response = services.api_request(
+        "IGDB",
+        "POST",
+        url,
+        data=data,
+        headers=get_headers(),
+    )
+    # response is a list with a single element, empty for unknown ids
+    if not response:
+        not_found = requests.Response()
+        not_found.status_code = requests.codes.not_found
+        msg = f"Game {media_id} not found"
+        raise requests.exceptions.HTTPError(msg, response=not_found)
+    return process_game(response[0])
+
+
+def fetch_games(media_ids):
+    """Request and process the metadata for many games from IGDB.
+
+    Each multiquery request answers up to MULTIQUERY_SIZE queries of
+    QUERY_LIMIT games. Returns the metadata by game id, games not found
+    are left out.
+    """
+    media_ids = [int(media_id) for media_id in media_ids]
+    queries = [
+        media_ids[start : start + QUERY_LIMIT]
+        for start in range(0, len(media_ids), QUERY_LIMIT)
+    ]
+    url = f"{base_url}/multiquery"
+    games = {}
+
+    for start in range(0, len(queries), MULTIQUERY_SIZE):
+        data = "".join(
+            f'query games "{index}" {{'
+            f"fields {GAME_FIELDS};"
+            f"where id = ({','.join(map(str, ids))});"
+            f"limit {QUERY_LIMIT};"
+            "};"
+            for index, ids in enumerate(queries[start : start + MULTIQUERY_SIZE])
         )
-        headers = {
-            "Client-ID": settings.IGDB_ID,
-            "Authorization": f"Bearer {access_token}",
-        }
-        response = services.api_request("IGDB", "POST", url, data=data, headers=headers)
-        response = response[0]  # response is a list with a single element
-        data = {
-            "media_id": response["id"],
-            "source": "igdb",
-            "media_type": "game",
-            "title": response["name"],
-            "max_progress": None,
-            "image": get_image_url(response),
-            "synopsis": response["summary"],
-            "details": {
-                "format": get_category(response["category"]),
-                "release_date": get_start_date(response),
-                "genres": get_str_list(response, "genres"),
-                "themes": get_str_list(response, "themes"),
-                "platforms": get_str_list(response, "platforms"),
-                "companies": get_companies(response),
-            },
-            "related": {
-                "parent_game": get_parent(response.get("parent_game")),
-                "remasters": get_related(response.get("remasters")),
-                "remakes": get_related(response.get("remakes")),
-                "expansions": get_related(response.get("expansions")),
-                "standalone_expansions": get_related(
-                    response.get("standalone_expansions"),
-                ),
-                "expanded_games": get_related(response.get("expanded_games")),
-                "recommendations": get_related(response.get("similar_games")),
-            },
-        }
-        cache.set(f"game_{media_id}", data)
-    return data
+        response = services.api_request(
+            "IGDB",
+            "POST",
+            url,
+            data=data,
+            headers=get_headers(),
+        )
+        for query in response:
+            for game in query["result"]:
+                games[game["id"]] = process_game(game)
+
+    return games
+
+
+def get_headers():
+    """Return the authentication headers of the IGDB API."""
+    return {
+        "Client-ID": settings.IGDB_ID,
+        "Authorization": f"Bearer {get_access_token()}",
+    }
+
+
+def process_game(response):
+    """Process the metadata of a game from IGDB."""
+    return {
+        "media_id": response["id"],
+        "source": "igdb",
+        "media_type": "game",
+        "title": response["name"],
+        "max_progress": None,
+        "image": get_image_url(response),
+        "synopsis": response["summary"],
+        "details": {
+            "format": get_category(response["category"]),
+            "release_date": get_start_date(response),
+            "genres": get_str_list(response, "genres"),
+            "themes": get_str_list(response, "themes"),
+            "platforms": get_str_list(response, "platforms"),
+            "companies": get_companies(response),
+        },
+        "related": {
+            "parent_game": get_parent(response.get("parent_game")),
+            "remasters": get_related(response.get("remasters")),
+            "remakes": get_related(response.get("remakes")),
+            "expansions": get_related(response.get("expansions")),
+            "standalone_expansions": get_related(
+                response.get("standalone_expansions"),
+            ),
+            "expanded_games": get_related(response.get("expanded_games")),
+            "recommendations": get_related(response.get("similar_games")),
+        },
+    }
 
 
 def get_image_url(response):
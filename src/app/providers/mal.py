@@ -3,9 +3,8 @@ from zoneinfo import ZoneInfo
 
 import requests
 from django.conf import settings
-from django.core.cache import cache
 
-from app.providers import services
+from app.providers import caching, services
 
 base_url = "https://api.myanimelist.net/v2"
 base_fields = "title,main_picture,media_type,start_date,end_date,synopsis,status,genres,recommendations"  # noqa: E501
@@ -13,7 +12,7 @@ base_fields = "title,main_picture,media_type,start_date,end_date,synopsis,status
 
 def search(media_type, query):
     """Search for media on MyAnimeList."""
-    data = cache.get(f"search_mal_{media_type}_{query}")
+    data = caching.get_search(f"search_mal_{media_type}", query)
 
     if data is None:
         url = f"{base_url}/{media_type}"
@@ -35,10 +34,10 @@ def search(media_type, query):
         except requests.exceptions.HTTPError as error:
             # if the query is invalid, return an empty list
             if error.response.json()["message"] == "invalid q":
+                caching.set_search(f"search_mal_{media_type}", query, [])
                 return []
             raise
 
-        response = response["data"]
         data = [
             {
                 "media_id": media["node"]["id"],
@@ -47,109 +46,105 @@ def search(media_type, query):
                 "title": media["node"]["title"],
                 "image": get_image_url(media["node"]),
             }
-            for media in response
+            for media in response["data"]
         ]
 
-        cache.set(f"search_mal_{media_type}_{query}", data)
+        caching.set_search(f"search_mal_{media_type}", query, data)
 
     return data
 
 
 def anime(media_id):
-    """Return the metadata for the selected anime or manga from MyAnimeList."""
-    data = cache.get(f"mal_anime_{media_id}")
+    """Return the metadata for the selected anime from MyAnimeList."""
+    return caching.get_or_fetch(f"mal_anime_{media_id}", fetch_anime, media_id)
 
-    if data is None:
-        url = f"{base_url}/anime/{media_id}"
-        params = {
-            "fields": f"{base_fields},num_episodes,average_episode_duration,studios,start_season,broadcast,source,related_anime",  # noqa: E501
-        }
-        response = services.api_request(
-            "MAL",
-            "GET",
-            url,
-            params=params,
-            headers={"X-MAL-CLIENT-ID": settings.MAL_API},
-        )
-
-        num_episodes = get_number_of_episodes(response)
-
-        data = {
-            "media_id": media_id,
-            "source": "mal",
-            "media_type": "anime",
-            "title": response["title"],
-            "max_progress": num_episodes,
-            "image": get_image_url(response),
-            "synopsis": get_synopsis(response),
-            "details": {
-                "format": get_format(response),
-                "start_date": response.get("start_date"),
-                "end_date": response.get("end_date"),
-                "status": get_readable_status(response),
-                "number_of_episodes": num_episodes,
-                "runtime": get_runtime(response),
-                "studios": get_studios(response),
-                "season": get_season(response),
-                "broadcast": get_broadcast(response),
-                "source": get_source(response),
-                "genres": get_genres(response),
-            },
-            "related": {
-                "related_anime": get_related(response.get("related_anime")),
-                "recommendations": get_related(response.get("recommendations")),
-            },
-        }
 
-        cache.set(f"mal_anime_{media_id}", data)
-
-    return data
+def fetch_anime(media_id):
+    """Request and process the metadata for an anime from MyAnimeList."""
+    url = f"{base_url}/anime/{media_id}"
+    params = {
+        "fields": f"{base_fields},num_episodes,average_episode_duration,studios,start_season,broadcast,source,related_anime",  # noqa: E501
+    }
+    response = services.api_request(
+        "MAL",
+        "GET",
+        url,
+        params=params,
+        headers={"X-MAL-CLIENT-ID": settings.MAL_API},
+    )
+
+    num_episodes = get_number_of_episodes(response)
+
+    return {
+        "media_id": media_id,
+        "source": "mal",
+        "media_type": "anime",
+        "title": response["title"],
+        "max_progress": num_episodes,
+        "image": get_image_url(response),
+        "synopsis": get_synopsis(response),
+        "details": {
+            "format": get_format(response),
+            "start_date": response.get("start_date"),
+            "end_date": response.get("end_date"),
+            "status": get_readable_status(response),
+            "number_of_episodes": num_episodes,
+            "runtime": get_runtime(response),
+            "studios": get_studios(response),
+            "season": get_season(response),
+            "broadcast": get_broadcast(response),
+            "source": get_source(response),
+            "genres": get_genres(response),
+        },
+        "related": {
+            "related_anime": get_related(response.get("related_anime")),
+            "recommendations": get_related(response.get("recommendations")),
+        },
+    }
 
 
 def manga(media_id):
-    """Return the metadata for the selected anime or manga from MyAnimeList."""
-    data = cache.get(f"mal_manga_{media_id}")
+    """Return the metadata for the selected manga from MyAnimeList."""
+    return caching.get_or_fetch(f"mal_manga_{media_id}", fetch_manga, media_id)
 
-    if data is None:
-        url = f"{base_url}/manga/{media_id}"
-        params = {
-            "fields": f"{base_fields},num_chapters,related_manga,recommendations",
-        }
-        response = services.api_request(
-            "MAL",
-            "GET",
-            url,
-            params=params,
-            headers={"X-MAL-CLIENT-ID": settings.MAL_API},
-        )
-
-        num_chapters = get_number_of_episodes(response)
-
-        data = {
-            "media_id": media_id,
-            "source": "mal",
-            "media_type": "manga",
-            "title": response["title"],
-            "image": get_image_url(response),
-            "synopsis": get_synopsis(response),
-            "max_progress": num_chapters,
-            "details": {
-                "format": get_format(response),
-                "start_date": response.get("start_date"),
-                "end_date": response.get("end_date"),
-                "status": get_readable_status(response),
-                "number_of_chapters": num_chapters,
-                "genres": get_genres(response),
-            },
-            "related": {
-                "related_manga": get_related(response.get("related_manga")),
-                "recommendations": get_related(response.get("recommendations")),
-            },
-        }
 
-        cache.set(f"mal_manga_{media_id}", data)
-
-    return data
+def fetch_manga(media_id):
+    """Request and process the metadata for a manga from MyAnimeList."""
+    url = f"{base_url}/manga/{media_id}"
+    params = {
+        "fields": f"{base_fields},num_chapters,related_manga,recommendations",
+    }
+    response = services.api_request(
+        "MAL",
+        "GET",
+        url,
+        params=params,
+        headers={"X-MAL-CLIENT-ID": settings.MAL_API},
+    )
+
+    num_chapters = get_number_of_episodes(response)
+
+    return {
+        "media_id": media_id,
+        "source": "mal",
+        "media_type": "manga",
+        "title": response["title"],
+        "image": get_image_url(response),
+        "synopsis": get_synopsis(response),
+        "max_progress": num_chapters,
+        "details": {
+            "format": get_format(response),
+            "start_date": response.get("start_date"),
+            "end_date": response.get("end_date"),
+            "status": get_readable_status(response),
+            "number_of_chapters": num_chapters,
+            "genres": get_genres(response),
+        },
+        "related": {
+            "related_manga": get_related(response.get("related_manga")),
+            "recommendations": get_related(response.get("recommendations")),
+        },
+    }
 
 
 def get_format(response):
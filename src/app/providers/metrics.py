@@ -0,0 +1,230 @@
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from app.providers import serializers, services
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "metrics"
+HOT_KEYS_KEY = "metrics_hot_keys"
+HOT_KEYS_KEPT = 1000  # most read cache keys tracked
+HOT_KEYS_SHOWN = 20
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # seconds
+
+METRICS = {
+    "provider_request_seconds": (
+        "histogram",
+        "Duration of the provider requests, without rate limiter waits",
+    ),
+    "provider_responses_total": (
+        "counter",
+        "Provider responses by status code, or error when none was received",
+    ),
+    "provider_rate_limit_wait_seconds": (
+        "histogram",
+        "Time spent waiting for the rate limiters and pauses of a host",
+    ),
+    "metadata_cache_reads_total": (
+        "counter",
+        "Metadata cache reads by key prefix, from memory, Redis, database or missed",
+    ),
+    "metadata_cache_stale_total": (
+        "counter",
+        "Stale metadata served while being refreshed, by key prefix",
+    ),
+    "metadata_cache_key_reads": (
+        "gauge",
+        "Reads of the most read metadata cache keys",
+    ),
+    "metadata_cache_entry_bytes": (
+        "summary",
+        "Serialized size of the metadata cache entries written, by key prefix",
+    ),
+}
+
+# cache reads are counted in memory and written to Redis with the next read
+# that goes to Redis anyway or when the metrics are rendered, local cache
+# hits would otherwise cost a Redis round trip each
+pending_fields = Counter()
+pending_hot_keys = Counter()
+pending_lock = threading.Lock()
+
+SERIES_PATTERN = re.compile(r"^(\w+?)(_bucket|_sum|_count)?(\{.*\})?$")
+LE_PATTERN = re.compile(r',?le="([^"]+)"\}$')
+
+
+def format_labels(labels):
+    """Return the labels in the Prometheus text format."""
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape(value)}"' for name, value in sorted(labels.items())
+    )
+    return f"{{{pairs}}}"
+
+
+def escape(value):
+    """Escape a label value for the Prometheus text format."""
+    value = str(value).replace("\\", r"\\")
+    return value.replace('"', r"\"").replace("\n", r"\n")
+
+
+def format_bucket_labels(series, le):
+    """Return the labels of a series with the le label of a bucket last."""
+    pairs = series[1:-1]
+    return f'{{{pairs},le="{le}"}}' if pairs else f'{{le="{le}"}}'
+
+
+def get_endpoint(url):
+    """Return the path of the URL with its ids replaced, e.g /3/movie/{id}."""
+    segments = urlsplit(url).path.strip("/").split("/")
+    for i in range(1, len(segments)):
+        # the first segment is the API version, e.g 3, v2 and v4
+        if any(char.isdigit() for char in segments[i]) or segments[i - 1] == "users":
+            segments[i] = "{id}"
+    return "/" + "/".join(segments)
+
+
+def increment(name, value=1, **labels):
+    """Add the value to a counter."""
+    if not settings.METRICS_ENABLED:
+        return
+    services.get_redis().hincrbyfloat(METRICS_KEY, name + format_labels(labels), value)
+
+
+def observe(name, seconds, **labels):
+    """Add a duration to a histogram."""
+    if not settings.METRICS_ENABLED:
+        return
+
+    le = next((str(bucket) for bucket in LATENCY_BUCKETS if seconds <= bucket), "+Inf")
+    series = format_labels(labels)
+    bucket_series = format_bucket_labels(series, le)
+
+    pipe = services.get_redis().pipeline(transaction=False)
+    # buckets are stored per interval and made cumulative when rendered
+    pipe.hincrby(METRICS_KEY, f"{name}_bucket{bucket_series}", 1)
+    pipe.hincrbyfloat(METRICS_KEY, f"{name}_sum{series}", seconds)
+    pipe.hincrby(METRICS_KEY, f"{name}_count{series}", 1)
+    pipe.execute()
+
+
+def record_cache_reads(*reads):
+    """Count the (key, source) reads of the metadata cache.
+
+    source is local, redis, database or miss.
+    """
+    if not settings.METRICS_ENABLED or not reads:
+        return
+
+    with pending_lock:
+        for key, source in reads:
+            prefix = serializers.get_key_prefix(key)
+            series = format_labels({"prefix": prefix, "source": source})
+            pending_fields[f"metadata_cache_reads_total{series}"] += 1
+            pending_hot_keys[key] += 1
+
+    if any(source != "local" for _, source in reads):
+        flush()
+
+
+def record_entry_sizes(sizes):
+    """Add the serialized size of the metadata cache entries by key."""
+    if not settings.METRICS_ENABLED or not sizes:
+        return
+
+    with pending_lock:
+        for key, size in sizes.items():
+            series = format_labels({"prefix": serializers.get_key_prefix(key)})
+            pending_fields[f"metadata_cache_entry_bytes_sum{series}"] += size
+            pending_fields[f"metadata_cache_entry_bytes_count{series}"] += 1
+
+    flush()
+
+
+def flush():
+    """Write the counters kept in memory to Redis."""
+    with pending_lock:
+        fields = dict(pending_fields)
+        hot_keys = dict(pending_hot_keys)
+        pending_fields.clear()
+        pending_hot_keys.clear()
+
+    if not fields and not hot_keys:
+        return
+
+    pipe = services.get_redis().pipeline(transaction=False)
+    for field, value in fields.items():
+        pipe.hincrbyfloat(METRICS_KEY, field, value)
+    for key, reads in hot_keys.items():
+        pipe.zincrby(HOT_KEYS_KEY, reads, key)
+    pipe.zremrangebyrank(HOT_KEYS_KEY, 0, -HOT_KEYS_KEPT - 1)
+    pipe.execute()
+
+
+def clear():
+    """Reset the metrics."""
+    with pending_lock:
+        pending_fields.clear()
+        pending_hot_keys.clear()
+    services.get_redis().delete(METRICS_KEY, HOT_KEYS_KEY)
+
+
+def render():
+    """Return the metrics in the Prometheus text format."""
+    flush()
+    redis = services.get_redis()
+    lines_by_name = defaultdict(list)
+    buckets = defaultdict(dict)
+
+    for field, value in sorted(redis.hgetall(METRICS_KEY).items()):
+        series = field.decode()
+        match = SERIES_PATTERN.match(series)
+        if match is None or match[1] not in METRICS:
+            continue
+
+        if match[2] == "_bucket":
+            le_match = LE_PATTERN.search(series)
+            pairs = series[len(match[1]) + len("_bucket{") : le_match.start()]
+            buckets[(match[1], pairs)][le_match[1]] = int(float(value))
+        else:
+            lines_by_name[match[1]].append(f"{series} {format_value(value)}")
+
+    for (name, pairs), counts in buckets.items():
+        series = f"{{{pairs}}}" if pairs else ""
+        total = 0
+        for le in [*map(str, LATENCY_BUCKETS), "+Inf"]:
+            total += counts.get(le, 0)
+            lines_by_name[name].append(
+                f"{name}_bucket{format_bucket_labels(series, le)} {total}",
+            )
+
+    for key, reads in redis.zrevrange(
+        HOT_KEYS_KEY,
+        0,
+        HOT_KEYS_SHOWN - 1,
+        withscores=True,
+    ):
+        series = format_labels({"key": key.decode()})
+        lines_by_name["metadata_cache_key_reads"].append(
+            f"metadata_cache_key_reads{series} {format_value(reads)}",
+        )
+
+    lines = []
+    for name, (metric_type, description) in METRICS.items():
+        if name in lines_by_name:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(lines_by_name[name])
+    return "\n".join(lines) + "\n"
+
+
+def format_value(value):
+    """Return a number without a decimal part when it's whole."""
+    number = float(value)
+    return str(int(number)) if number.is_integer() else str(number)
@@ -0,0 +1,186 @@
+import asyncio
+import contextvars
+import email.utils
+import logging
+import random
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+from pyrate_limiter import Limiter, RequestRate
+from pyrate_limiter.limit_context_decorator import LimitContextDecorator
+from requests_ratelimiter import LimiterAdapter
+
+from app.providers import metrics, services
+
+logger = logging.getLogger(__name__)
+
+PAUSE_KEY = "ratelimit_pause:{host}"
+LIMIT_MARGIN = 0.95  # fraction of the limit reported by the provider that is used
+MAX_BACKOFF = 60  # seconds
+
+# views and tasks fail fast instead of waiting for long rate limit pauses
+wait_on_rate_limit = contextvars.ContextVar("wait_on_rate_limit", default=True)
+# seconds the current request waited for the rate limiters, kept out of its latency
+limiter_wait = contextvars.ContextVar("limiter_wait", default=0)
+
+
+class RateLimitedError(Exception):
+    """The provider is rate limited for longer than the caller can wait."""
+
+    def __init__(self, host, retry_after):
+        """Store the host and the seconds until it accepts requests again."""
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(f"Rate limited by {host}, retry in {retry_after:.0f} seconds")
+
+
+class TimedLimitContext(LimitContextDecorator):
+    """Limiter context that records the time spent waiting for the bucket."""
+
+    def __init__(self, limiter, *identities, **kwargs):
+        """Keep the identity of the bucket for the metrics."""
+        super().__init__(limiter, *identities, **kwargs)
+        self.host = str(identities[0]) if identities else ""
+
+    def delayed_acquire(self):
+        """Wait for the bucket and record the wait."""
+        start = time.monotonic()
+        super().delayed_acquire()
+        record_wait(self.host, time.monotonic() - start)
+
+    async def async_delayed_acquire(self):
+        """Asynchronous version of delayed_acquire."""
+        start = time.monotonic()
+        await super().async_delayed_acquire()
+        await asyncio.to_thread(
+            metrics.observe,
+            "provider_rate_limit_wait_seconds",
+            time.monotonic() - start,
+            host=self.host,
+        )
+
+
+class TimedLimiter(Limiter):
+    """Limiter that records the time spent waiting for its buckets."""
+
+    def ratelimit(self, *identities, delay=False, max_delay=None):
+        """Return the context that waits for the buckets of the identities."""
+        return TimedLimitContext(self, *identities, delay=delay, max_delay=max_delay)
+
+
+class AdaptiveLimiterAdapter(LimiterAdapter):
+    """Limiter adapter that follows the rate limit headers of the provider.
+
+    The configured rate is used until the provider reports its own limit, and
+    every process waits while the provider asks to slow down.
+    """
+
+    def __init__(self, limit, interval, **kwargs):
+        """Limit the requests to limit every interval seconds."""
+        self.rate = RequestRate(limit, interval)
+        super().__init__(limiter=TimedLimiter(self.rate), **kwargs)
+
+    def set_limit(self, limit):
+        """Replace the rate of the bucket with the limit reported by the provider."""
+        limit = max(1, int(limit * LIMIT_MARGIN))
+        if limit != self.rate.limit:
+            logger.info(
+                "Rate limit changed from %s to %s requests every %s seconds",
+                self.rate.limit,
+                limit,
+                self.rate.interval,
+            )
+            self.rate = RequestRate(limit, self.rate.interval)
+            self.limiter = TimedLimiter(self.rate)
+
+
+def update_from_headers(url, headers):
+    """Adapt the rate limit of the host to the headers of its response."""
+    adapter = services.session.get_adapter(services.get_request_url(url))
+    if isinstance(adapter, AdaptiveLimiterAdapter) and "X-RateLimit-Limit" in headers:
+        adapter.set_limit(int(headers["X-RateLimit-Limit"]))
+
+    seconds = get_pause_seconds(headers)
+    if seconds:
+        pause_host(urlparse(url).netloc, seconds)
+
+
+def get_pause_seconds(headers):
+    """Return the seconds the provider asks to wait before the next request."""
+    if "Retry-After" in headers:
+        return parse_retry_after(headers["Retry-After"])
+
+    if headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in headers:
+        return max(0, float(headers["X-RateLimit-Reset"]) - time.time())
+
+    return 0
+
+
+def parse_retry_after(value):
+    """Return the seconds of a Retry-After header, in seconds or as an HTTP date."""
+    try:
+        return max(0, float(value))
+    except ValueError:
+        date = email.utils.parsedate_to_datetime(value)
+        return max(0, date.timestamp() - time.time())
+
+
+def pause_host(host, seconds):
+    """Make every process wait before sending requests to the host."""
+    logger.warning("Rate limited by %s, pausing for %.1f seconds", host, seconds)
+    services.get_redis().set(
+        PAUSE_KEY.format(host=host),
+        time.time() + seconds,
+        px=max(1, int(seconds * 1000)),
+    )
+
+
+def get_pause(host):
+    """Return the seconds left before requests to the host can be sent."""
+    paused_until = services.get_redis().get(PAUSE_KEY.format(host=host))
+    if paused_until is None:
+        return 0
+    return max(0, float(paused_until) - time.time())
+
+
+def check_pause(host, seconds):
+    """Raise RateLimitedError if the caller can't wait for the pause."""
+    if not wait_on_rate_limit.get() and seconds > settings.RATE_LIMIT_MAX_WAIT:
+        raise RateLimitedError(host, seconds)
+
+
+def wait_for_pause(host):
+    """Wait until requests to the host can be sent."""
+    seconds = get_pause(host)
+    if seconds:
+        check_pause(host, seconds)
+        logger.info("Waiting %.1f seconds for %s", seconds, host)
+        time.sleep(seconds)
+        metrics.observe("provider_rate_limit_wait_seconds", seconds, host=host)
+
+
+async def async_wait_for_pause(host):
+    """Asynchronous version of wait_for_pause."""
+    seconds = await asyncio.to_thread(get_pause, host)
+    if seconds:
+        check_pause(host, seconds)
+        logger.info("Waiting %.1f seconds for %s", seconds, host)
+        await asyncio.sleep(seconds)
+        await asyncio.to_thread(
+            metrics.observe,
+            "provider_rate_limit_wait_seconds",
+            seconds,
+            host=host,
+        )
+
+
+def record_wait(host, seconds):
+    """Record a rate limiter wait and add it to the wait of the current request."""
+    limiter_wait.set(limiter_wait.get() + seconds)
+    metrics.observe("provider_rate_limit_wait_seconds", seconds, host=host)
+
+
+def backoff_delay(attempt, delay=1):
+    """Return the seconds before a retry, growing exponentially with full jitter."""
+    return random.uniform(0, min(MAX_BACKOFF, delay * 2**attempt))  # noqa: S311
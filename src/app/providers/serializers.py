@@ -0,0 +1,100 @@
+import json
+import logging
+import pickle
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Serializer:
+    """Base class for the serializers of cached provider metadata.
+
+    The prefix is stored in front of the payload so entries written by any
+    serializer can still be read after changing METADATA_CACHE_SERIALIZER.
+    """
+
+    prefix = b""
+
+    def encode(self, value):
+        """Return the value as bytes, without the prefix."""
+        raise NotImplementedError
+
+    def decode(self, data):
+        """Return the value from its bytes, without the prefix."""
+        raise NotImplementedError
+
+
+class PickleSerializer(Serializer):
+    """Pickle, same format as Django's default cache serializer."""
+
+    prefix = b"p1:"
+
+    def encode(self, value):
+        """Pickle the value."""
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data):
+        """Unpickle the value."""
+        return pickle.loads(data)  # noqa: S301
+
+
+class JSONSerializer(Serializer):
+    """Compact JSON, metadata only contains JSON types."""
+
+    prefix = b"j1:"
+
+    def encode(self, value):
+        """Encode the value as compact JSON."""
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def decode(self, data):
+        """Decode the value from JSON."""
+        return json.loads(data)
+
+
+class JSONZlibSerializer(JSONSerializer):
+    """Compact JSON compressed with zlib."""
+
+    prefix = b"jz1:"
+    level = 6
+
+    def encode(self, value):
+        """Encode the value as compressed JSON."""
+        return zlib.compress(super().encode(value), self.level)
+
+    def decode(self, data):
+        """Decode the value from compressed JSON."""
+        return super().decode(zlib.decompress(data))
+
+
+SERIALIZERS = [PickleSerializer, JSONSerializer, JSONZlibSerializer]
+
+
+def get_key_prefix(key):
+    """Return the key without its ids, e.g season_1396_1 -> season."""
+    return re.sub(r"_\d.*$", "", key)
+
+
+def get_serializer():
+    """Return the configured serializer."""
+    return import_string(settings.METADATA_CACHE_SERIALIZER)()
+
+
+def dumps(value):
+    """Serialize the value with the configured serializer."""
+    serializer = get_serializer()
+    return serializer.prefix + serializer.encode(value)
+
+
+def loads(key, data):
+    """Deserialize the value of the key, return None if the format is unknown."""
+    for serializer_class in SERIALIZERS:
+        if data.startswith(serializer_class.prefix):
+            return serializer_class().decode(data[len(serializer_class.prefix) :])
+
+    logger.warning("Unknown serialization format for %s, ignoring it", key)
+    return None
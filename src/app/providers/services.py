@@ -1,15 +1,36 @@
+import asyncio
+import atexit
+import contextvars
+import hashlib
 import logging
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import wraps
+from urllib.parse import urlparse, urlsplit
 
+import aiohttp
 import requests
 from django.conf import settings
 from django.core.cache import cache
-from pyrate_limiter import RedisBucket
-from redis import ConnectionPool
-from requests_ratelimiter import LimiterAdapter, LimiterSession
-
-from app.providers import igdb, mal, mangaupdates, manual, tmdb
+from pyrate_limiter import Duration, RedisBucket, RequestRate
+from redis import ConnectionPool, Redis
+from requests.structures import CaseInsensitiveDict
+from requests_ratelimiter import LimiterSession
+
+from app import models
+from app.providers import (
+    caching,
+    circuitbreaker,
+    igdb,
+    mal,
+    mangaupdates,
+    manual,
+    metrics,
+    ratelimit,
+    tmdb,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,78 +46,476 @@ def get_redis_connection():
 
 redis_pool = get_redis_connection()
 
+
+def get_redis():
+    """Return a Redis client using the shared connection pool."""
+    return Redis(connection_pool=redis_pool)
+
+
+# validators sent and received by the requests of the current metadata fetch
+conditional_requests = contextvars.ContextVar("conditional_requests", default=None)
+# time.monotonic() by which the provider calls of the current view must end
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+# set when the current metadata fetch skipped some of its optional requests
+incomplete_fetch = contextvars.ContextVar("incomplete_fetch", default=None)
+
+
+def get_request_url(url):
+    """Return the URL a provider request is sent to.
+
+    With PROVIDER_BASE_URL set, requests go to the stand-in server as
+    {PROVIDER_BASE_URL}/{host}/{path}.
+    """
+    if not settings.PROVIDER_BASE_URL:
+        return url
+
+    parts = urlsplit(url)
+    request_url = f"{settings.PROVIDER_BASE_URL.rstrip('/')}/{parts.netloc}{parts.path}"
+    if parts.query:
+        request_url = f"{request_url}?{parts.query}"
+    return request_url
+
+
 session = LimiterSession(
-    per_second=5,
-    bucket_class=RedisBucket,
-    bucket_kwargs={"redis_pool": redis_pool, "bucket_name": "api"},
-)
-session.mount(
-    "https://api.myanimelist.net/v2",
-    LimiterAdapter(per_minute=30),
-)
-session.mount(
-    "https://graphql.anilist.co",
-    LimiterAdapter(per_minute=85),
-)
-session.mount(
-    "https://api.igdb.com/v4",
-    LimiterAdapter(per_second=3),
+    limiter=ratelimit.TimedLimiter(
+        RequestRate(settings.API_RATE_LIMIT, Duration.SECOND),
+        bucket_class=RedisBucket,
+        bucket_kwargs={"redis_pool": redis_pool, "bucket_name": "api"},
+        # the buckets are shared by every process, monotonic clocks aren't
+        time_function=time.time,
+    ),
 )
+for prefix, rate in settings.PROVIDER_RATE_LIMITS.items():
+    session.mount(get_request_url(prefix), ratelimit.AdaptiveLimiterAdapter(**rate))
+
+
+# long-lived event loop and aiohttp session of the current process,
+# recreated after a fork (gunicorn and celery workers)
+async_state = {"pid": None, "loop": None, "session": None}
+async_lock = threading.Lock()
+
 
+def get_event_loop():
+    """Return the event loop of this process, running in a background thread."""
+    with async_lock:
+        if async_state["pid"] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever,
+                name="provider-event-loop",
+                daemon=True,
+            ).start()
+            async_state.update(pid=os.getpid(), loop=loop, session=None)
+        return async_state["loop"]
 
-def retry_on_error(delay=1):
-    """Retry a function if it raises a RequestException."""
+
+def run_async(coroutine):
+    """Run a coroutine in the process event loop and wait for its result."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coroutine.close()
+        msg = "run_async can't be called from a running event loop, await instead."
+        raise RuntimeError(msg)
+
+    return asyncio.run_coroutine_threadsafe(
+        run_in_context(coroutine, contextvars.copy_context()),
+        get_event_loop(),
+    ).result()
+
+
+async def run_in_context(coroutine, context):
+    """Await the coroutine with the context variables of the calling thread."""
+    for var, value in context.items():
+        var.set(value)
+    return await coroutine
+
+
+def get_async_session():
+    """Return the pooled aiohttp session bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    async_session = async_state["session"]
+
+    # sessions can't be shared between event loops
+    if async_session is None or async_session.closed or async_session.loop is not loop:
+        async_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=settings.REQUEST_TIMEOUT),
+        )
+        async_state["session"] = async_session
+    return async_session
+
+
+@atexit.register
+def close_async_session():
+    """Close the pooled aiohttp session when the process exits."""
+    async_session = async_state["session"]
+    if (
+        async_state["pid"] == os.getpid()
+        and async_session is not None
+        and not async_session.closed
+        and async_session.loop is async_state["loop"]
+    ):
+        asyncio.run_coroutine_threadsafe(
+            async_session.close(),
+            async_state["loop"],
+        ).result(timeout=5)
+
+
+def retry_on_error(retries=2, delay=1):
+    """Retry a function if it raises a transient request error.
+
+    The waits between attempts grow exponentially from delay, with jitter.
+    """
 
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                for attempt in range(retries):
+                    try:
+                        return await func(*args, **kwargs)
+                    except (aiohttp.ClientError, TimeoutError):
+                        await asyncio.sleep(get_retry_delay(attempt, delay))
+                return await func(*args, **kwargs)
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            try:
-                return func(*args, **kwargs)
-            except requests.exceptions.RequestException:
-                msg = f"Request failed. Retrying in {delay} seconds."
-                logger.warning(msg)
-                time.sleep(delay)
+            for attempt in range(retries):
                 try:
                     return func(*args, **kwargs)
-                except requests.exceptions.RequestException:
-                    msg = "Request failed after retry. Raising error."
-                    logger.error(msg)  # noqa: TRY400
-                    raise
+                except requests.exceptions.RequestException as error:
+                    if not is_transient(error):
+                        raise
+                    time.sleep(get_retry_delay(attempt, delay))
+            return func(*args, **kwargs)
 
         return wrapper
 
     return decorator
 
 
-@retry_on_error(delay=1)
+def get_retry_delay(attempt, delay):
+    """Return the seconds to wait before retrying a failed request."""
+    seconds = ratelimit.backoff_delay(attempt, delay)
+    remaining = get_remaining_time()
+    if remaining is not None:
+        seconds = min(seconds, remaining)
+    logger.warning("Request failed. Retrying in %.1f seconds.", seconds)
+    return seconds
+
+
+def is_transient(error):
+    """Return whether a request error may succeed when retried."""
+    # client errors like 404 won't change by retrying
+    response = getattr(error, "response", None)
+    return response is None or response.status_code >= requests.codes.server_error
+
+
+class NotModifiedError(Exception):
+    """The provider reported no changes since the cached response."""
+
+
+class DeadlineExceededError(Exception):
+    """The time budget of the current view is spent."""
+
+    retry_after = 0
+
+
+class CachedNotFoundError(requests.exceptions.HTTPError):
+    """The provider recently answered not found, the request wasn't sent again."""
+
+
+def get_not_found_key(method, url, params, data):
+    """Return the cache key of a not found response to the request."""
+    request = f"{method} {get_request_key(url, params)} {data or ''}"
+    return f"not_found_{hashlib.sha256(request.encode()).hexdigest()}"
+
+
+def check_not_found(method, url, params, data):
+    """Raise CachedNotFoundError if the request was recently not found."""
+    content = cache.get(get_not_found_key(method, url, params, data))
+    if content is not None:
+        response = requests.Response()
+        response.status_code = requests.codes.not_found
+        response.url = url
+        response._content = content  # noqa: SLF001
+        msg = f"404 Client Error: Not Found for url: {url} (cached)"
+        raise CachedNotFoundError(msg, response=response)
+
+
+def cache_not_found(error, method, url, params, data):
+    """Remember a not found response to skip the request for a while."""
+    if error.response.status_code == requests.codes.not_found:
+        cache.set(
+            get_not_found_key(method, url, params, data),
+            error.response.content,
+            settings.METADATA_NOT_FOUND_TTL,
+        )
+
+
+def get_remaining_time():
+    """Return the seconds left before the deadline, None if there's none."""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return max(0, deadline - time.monotonic())
+
+
+def check_deadline(url):
+    """Raise DeadlineExceededError if the deadline is spent."""
+    if get_remaining_time() == 0:
+        msg = f"Deadline exceeded, skipping request to {url}"
+        raise DeadlineExceededError(msg)
+
+
+def mark_incomplete():
+    """Flag the current metadata fetch as missing some optional data."""
+    tracker = incomplete_fetch.get()
+    if tracker is not None:
+        tracker["incomplete"] = True
+
+
+def get_provider_timeout(provider):
+    """Return the (connect, read) timeouts of the provider in this context."""
+    context = "background" if request_deadline.get() is None else "interactive"
+    timeouts = settings.PROVIDER_TIMEOUTS.get(
+        provider,
+        settings.PROVIDER_TIMEOUTS["default"],
+    )
+    return timeouts[context]
+
+
+def get_timeout(provider):
+    """Return the (connect, read) timeouts of the provider, within the deadline."""
+    connect, read = get_provider_timeout(provider)
+    remaining = get_remaining_time()
+    if remaining is None:
+        return connect, read
+    return min(connect, remaining), min(read, remaining)
+
+
+@retry_on_error()
 def api_request(provider, method, url, params=None, data=None, headers=None):  # noqa: PLR0913
     """Make a request to the API and return the response as a dictionary."""
+    check_not_found(method, url, params, data)
     try:
+        timeout = get_timeout(provider)
         request_kwargs = {
-            "url": url,
+            "url": get_request_url(url),
             "headers": headers,
-            "timeout": settings.REQUEST_TIMEOUT,
+            "timeout": timeout,
         }
 
         if method == "GET":
             request_kwargs["params"] = params
+            request_kwargs["headers"] = get_conditional_headers(url, params, headers)
             request_func = session.get
         elif method == "POST":
             request_kwargs["data"] = data
             request_kwargs["json"] = params
             request_func = session.post
 
-        response = request_func(**request_kwargs)
+        check_deadline(url)
+        circuitbreaker.check(provider)
+        ratelimit.wait_for_pause(urlparse(url).netloc)
+        ratelimit.limiter_wait.set(0)
+        start = time.monotonic()
+        try:
+            response = request_func(**request_kwargs)
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ) as error:
+            metrics.increment(
+                "provider_responses_total",
+                provider=provider,
+                status=type(error).__name__,
+            )
+            # timeouts cut short by the deadline say nothing about the provider
+            if timeout == get_provider_timeout(provider):
+                circuitbreaker.record_failure(provider)
+            raise
+        record_response(
+            provider,
+            url,
+            response.status_code,
+            time.monotonic() - start - ratelimit.limiter_wait.get(),
+        )
+        ratelimit.update_from_headers(url, response.headers)
+        if response.status_code == requests.codes.not_modified:
+            raise NotModifiedError(url)
         response.raise_for_status()
+        circuitbreaker.record_success(provider)
         json_response = response.json()
 
+        if method == "GET":
+            save_validators(url, params, response)
+
     except requests.exceptions.HTTPError as error:
+        circuitbreaker.record_error(provider, error)
+        cache_not_found(error, method, url, params, data)
         args = (provider, method, url, params, data, headers)
         json_response = request_error_handling(error, *args)
 
     return json_response
 
 
+def record_response(provider, url, status, seconds):
+    """Record the latency and status code of a provider response."""
+    metrics.observe(
+        "provider_request_seconds",
+        seconds,
+        provider=provider,
+        endpoint=metrics.get_endpoint(url),
+    )
+    metrics.increment("provider_responses_total", provider=provider, status=status)
+
+
+def get_request_key(url, params):
+    """Return the full URL of a GET request, used to match its validators."""
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+def get_conditional_headers(url, params, headers):
+    """Add the validators of the previous response to the request headers."""
+    conditional = conditional_requests.get()
+    if conditional is None:
+        return headers
+
+    validators = conditional["sent"].get(get_request_key(url, params))
+    if not validators:
+        return headers
+
+    headers = dict(headers or {})
+    if "etag" in validators:
+        headers["If-None-Match"] = validators["etag"]
+    if "last_modified" in validators:
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def save_validators(url, params, response):
+    """Keep the validators of the response for the next conditional request."""
+    conditional = conditional_requests.get()
+    if conditional is None:
+        return
+
+    validators = {}
+    if "ETag" in response.headers:
+        validators["etag"] = response.headers["ETag"]
+    if "Last-Modified" in response.headers:
+        validators["last_modified"] = response.headers["Last-Modified"]
+    conditional["received"][get_request_key(url, params)] = validators
+
+
+@retry_on_error()
+async def async_api_request(  # noqa: PLR0913
+    provider,
+    method,
+    url,
+    params=None,
+    data=None,
+    headers=None,
+    *,
+    rate_limited=True,
+):
+    """Asynchronous version of api_request using the pooled aiohttp session."""
+    request_kwargs = {"headers": headers}
+
+    if method == "GET":
+        request_kwargs["params"] = params
+    elif method == "POST":
+        request_kwargs["data"] = data
+        request_kwargs["json"] = params
+
+    await asyncio.to_thread(check_not_found, method, url, params, data)
+    check_deadline(url)
+    await asyncio.to_thread(circuitbreaker.check, provider)
+    if rate_limited:
+        await wait_for_rate_limit(url)
+
+    connect, read = get_timeout(provider)
+    request_kwargs["timeout"] = aiohttp.ClientTimeout(
+        total=get_remaining_time(),
+        sock_connect=connect,
+        sock_read=read,
+    )
+
+    async_session = get_async_session()
+    start = time.monotonic()
+    try:
+        async with async_session.request(
+            method,
+            get_request_url(url),
+            **request_kwargs,
+        ) as response:
+            content = await response.read()
+            status = response.status
+            response_headers = response.headers
+    except (aiohttp.ClientError, TimeoutError) as error:
+        await asyncio.to_thread(
+            metrics.increment,
+            "provider_responses_total",
+            provider=provider,
+            status=type(error).__name__,
+        )
+        # timeouts cut short by the deadline say nothing about the provider
+        if (connect, read) == get_provider_timeout(provider):
+            await asyncio.to_thread(circuitbreaker.record_failure, provider)
+        raise
+
+    await asyncio.to_thread(
+        record_response,
+        provider,
+        url,
+        status,
+        time.monotonic() - start,
+    )
+
+    ratelimit.update_from_headers(url, response_headers)
+
+    sync_response = requests.Response()
+    sync_response.status_code = status
+    sync_response.headers = CaseInsensitiveDict(response_headers)
+    sync_response._content = content  # noqa: SLF001
+    sync_response.url = url
+
+    try:
+        sync_response.raise_for_status()
+    except requests.exceptions.HTTPError as error:
+        await asyncio.to_thread(circuitbreaker.record_error, provider, error)
+        await asyncio.to_thread(cache_not_found, error, method, url, params, data)
+        # error handling may sleep or refresh tokens, keep it off the event loop
+        args = (provider, method, url, params, data, headers)
+        return await asyncio.to_thread(request_error_handling, error, *args)
+
+    await asyncio.to_thread(circuitbreaker.record_success, provider)
+
+    return sync_response.json()
+
+
+async def wait_for_rate_limit(url):
+    """Wait until the rate limits of the shared session allow a request to the URL."""
+    await ratelimit.async_wait_for_pause(urlparse(url).netloc)
+    await session.limiter.ratelimit(
+        session.bucket_name,
+        delay=True,
+    ).async_delayed_acquire()
+
+    adapter = session.get_adapter(get_request_url(url))
+    if isinstance(adapter, ratelimit.AdaptiveLimiterAdapter):
+        await adapter.limiter.ratelimit(
+            urlparse(url).netloc,
+            delay=True,
+        ).async_delayed_acquire()
+
+
 def request_error_handling(error, *args):
     """Handle errors when making a request to the API."""
     # unpack the arguments
@@ -107,9 +526,10 @@ def request_error_handling(error, *args):
 
     # handle rate limiting
     if status_code == requests.codes.too_many_requests:
-        seconds_to_wait = int(error_resp.headers["Retry-After"])
-        logger.warning("Rate limited, waiting %s seconds", seconds_to_wait)
-        time.sleep(seconds_to_wait + 3)
+        # the host is paused from the response headers, back off if they're missing
+        host = urlparse(url).netloc
+        if not ratelimit.get_pause(host):
+            ratelimit.pause_host(host, ratelimit.backoff_delay(attempt=2))
         logger.info("Retrying request")
         return api_request(
             provider,
@@ -179,3 +599,250 @@ def get_media_metadata(media_type, media_id, source, season_number=None):
         "game": lambda: igdb.game(media_id),
     }
     return metadata_retrievers[media_type]()
+
+
+# provider get_media_metadata uses for each media type when no source is given
+DEFAULT_SOURCES = {
+    "anime": "mal",
+    "manga": "mal",
+    "tv": "tmdb",
+    "season": "tmdb",
+    "movie": "tmdb",
+    "game": "igdb",
+}
+
+
+def get_item_metadata(media_type, media_id, source, season_number=None):
+    """Return the title and image saved for the item, None if it isn't saved."""
+    item = models.Item.objects.filter(
+        media_type=media_type,
+        media_id=media_id,
+        source=source or DEFAULT_SOURCES[media_type],
+        season_number=season_number,
+        episode_number=None,
+    ).first()
+
+    if item is None:
+        return None
+
+    return {
+        "media_id": item.media_id,
+        "source": item.source,
+        "media_type": item.media_type,
+        "title": item.title,
+        "max_progress": None,
+        "image": item.image,
+        "season_number": item.season_number,
+        "synopsis": "No synopsis available.",
+        "details": {},
+        "related": {},
+    }
+
+
+def get_metadata_fetcher(media_type, media_id, source, season_number=None):
+    """Return the cache key and the fetch function with its arguments."""
+    if media_type == "manga" and source == "mangaupdates":
+        return f"mangaupdates_manga_{media_id}", mangaupdates.async_manga, (media_id,)
+
+    if media_type == "season":
+        return (
+            f"season_{media_id}_{season_number}",
+            tmdb.fetch_season,
+            (media_id, season_number),
+        )
+
+    fetchers = {
+        "anime": (f"mal_anime_{media_id}", mal.fetch_anime),
+        "manga": (f"mal_manga_{media_id}", mal.fetch_manga),
+        "tv": (f"tv_{media_id}", tmdb.fetch_tv),
+        "movie": (f"movie_{media_id}", tmdb.fetch_movie),
+        "game": (f"game_{media_id}", igdb.fetch_game),
+    }
+    key, fetch = fetchers[media_type]
+    return key, fetch, (media_id,)
+
+
+# searches of the all types search by label, sent to every provider at once
+SEARCHES = {
+    "TV": lambda query: tmdb.search("tv", query),
+    "Movie": lambda query: tmdb.search("movie", query),
+    "Anime": lambda query: mal.search("anime", query),
+    "Manga": lambda query: mal.search("manga", query),
+    "Manga (MangaUpdates)": lambda query: mangaupdates.search(query),
+    "Game": lambda query: igdb.search(query),
+}
+
+
+def search_all(query):
+    """Search every provider concurrently, within SEARCH_DEADLINE.
+
+    Returns the results by search label in SEARCHES order and the labels of
+    the searches that failed or ran out of time.
+    """
+    deadline = time.monotonic() + settings.SEARCH_DEADLINE
+    if request_deadline.get() is not None:
+        deadline = min(deadline, request_deadline.get())
+    token = request_deadline.set(deadline)
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(SEARCHES)) as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, search, query): label
+                for label, search in SEARCHES.items()
+            }
+            for future in as_completed(futures):
+                label = futures[future]
+                try:
+                    results[label] = future.result()
+                except (
+                    requests.exceptions.RequestException,
+                    DeadlineExceededError,
+                    ratelimit.RateLimitedError,
+                    circuitbreaker.ProviderUnavailableError,
+                ) as error:
+                    logger.warning("%s search failed: %s", label, error)
+    finally:
+        request_deadline.reset(token)
+
+    return (
+        {label: results[label] for label in SEARCHES if label in results},
+        [label for label in SEARCHES if label not in results],
+    )
+
+
+# fetch functions with a version fetching many ids in few requests,
+# returning the metadata by id
+BATCH_FETCHERS = {igdb.fetch_game: igdb.fetch_games}
+# errors of a single fetch returned in its place by get_media_metadata_many
+FETCH_ERRORS = (
+    requests.exceptions.RequestException,
+    ratelimit.RateLimitedError,
+    circuitbreaker.ProviderUnavailableError,
+    DeadlineExceededError,
+)
+
+
+def get_media_metadata_many(media_list):
+    """Return the metadata for many media at once.
+
+    media_list holds (media_type, media_id, source, season_number) tuples.
+    Cached metadata is read in a single round trip, the rest is fetched
+    concurrently, batched when the provider allows it, and cached together.
+    The result maps each tuple to its metadata or to the error of FETCH_ERRORS
+    raised while fetching it, so one failure doesn't lose the rest.
+    """
+    results = {}
+    fetchers = {}
+
+    for media in media_list:
+        media_type, media_id, source, season_number = media
+        if source == "manual":
+            results[media] = manual.metadata(media_id)
+        else:
+            fetchers[media] = get_metadata_fetcher(
+                media_type,
+                media_id,
+                source,
+                season_number,
+            )
+
+    cached = caching.get_many_cached(
+        {key: (fetch, args) for key, fetch, args in fetchers.values()},
+    )
+    missing = {}
+    for media, (key, fetch, args) in fetchers.items():
+        if key in cached:
+            results[media] = cached[key]
+        else:
+            missing.setdefault(key, (fetch, args, []))[2].append(media)
+
+    fetched = {}
+    incomplete = set()
+    for key, data in fetch_many(missing, incomplete).items():
+        if not isinstance(data, Exception):
+            fetched[key] = data
+        for media in missing[key][2]:
+            results[media] = data
+
+    caching.set_many_cached(fetched, stale_keys=incomplete)
+    return results
+
+
+def fetch_many(missing, incomplete):
+    """Fetch the metadata of many keys concurrently.
+
+    missing maps each key to its (fetch, args, ...). Returns the metadata
+    or the error of FETCH_ERRORS raised fetching it by key, the keys fetched
+    without some optional data are added to the incomplete set.
+    """
+    singles = {}
+    batches = {}
+    for key, (fetch, args, *_) in missing.items():
+        if fetch in BATCH_FETCHERS:
+            batches.setdefault(fetch, {})[int(args[0])] = key
+        else:
+            singles[key] = (fetch, args)
+
+    results = {}
+    with ThreadPoolExecutor(
+        max_workers=settings.METADATA_FETCH_CONCURRENCY,
+    ) as executor:
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                fetch_single,
+                key,
+                fetch,
+                *args,
+                incomplete=incomplete,
+            )
+            for key, (fetch, args) in singles.items()
+        ]
+        futures += [
+            executor.submit(
+                contextvars.copy_context().run,
+                fetch_batch,
+                fetch,
+                keys_by_id,
+                incomplete,
+            )
+            for fetch, keys_by_id in batches.items()
+        ]
+        for future in as_completed(futures):
+            results.update(future.result())
+    return results
+
+
+def fetch_single(key, fetch, *args, incomplete):
+    """Return {key: metadata}, or the error of FETCH_ERRORS raised fetching it."""
+    try:
+        data, complete = caching.fetch_metadata(fetch, *args)
+    except FETCH_ERRORS as error:
+        logger.warning("Failed to fetch metadata for %s: %s", key, error)
+        return {key: error}
+    if not complete:
+        incomplete.add(key)
+    return {key: data}
+
+
+def fetch_batch(fetch, keys_by_id, incomplete):
+    """Return the metadata of many ids by key, fetched with the batch fetcher.
+
+    Ids missing from the batch are fetched again one by one with fetch, so
+    only the provider's answer to that request can be a not found error.
+    """
+    batch_fetch = BATCH_FETCHERS[fetch]
+    try:
+        data_by_id = batch_fetch(list(keys_by_id))
+    except FETCH_ERRORS as error:
+        logger.warning("Failed to fetch metadata for %s: %s", batch_fetch, error)
+        return dict.fromkeys(keys_by_id.values(), error)
+
+    results = {}
+    for media_id, key in keys_by_id.items():
+        if media_id in data_by_id:
+            results[key] = data_by_id[media_id]
+        else:
+            results.update(fetch_single(key, fetch, media_id, incomplete=incomplete))
+    return results
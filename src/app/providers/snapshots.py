@@ -0,0 +1,103 @@
+import datetime
+import logging
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+# e.g movie_1, season_1396_1, mal_anime_1 and mangaupdates_manga_1
+KEY_PATTERN = re.compile(
+    r"^(?:(mal|mangaupdates)_)?(movie|tv|season|anime|manga|game)_(\d+)(?:_(\d+))?$",
+)
+SOURCES = {"movie": "tmdb", "tv": "tmdb", "season": "tmdb", "game": "igdb"}
+
+
+def get_model():
+    """Return the snapshot model, not imported as app.models imports providers."""
+    return apps.get_model("app", "MetadataSnapshot")
+
+
+def parse_key(key):
+    """Return the source, media type, media id and season number of a key.
+
+    Returns None for the keys that aren't media metadata, e.g searches.
+    """
+    match = KEY_PATTERN.match(key)
+    if match is None:
+        return None
+
+    source = match[1] or SOURCES.get(match[2])
+    if source is None:
+        return None
+    season_number = int(match[4]) if match[4] else None
+    return source, match[2], int(match[3]), season_number
+
+
+def load_many(keys):
+    """Return the cache entries of the keys stored in the database."""
+    keys = [key for key in keys if parse_key(key)]
+    if not settings.METADATA_SNAPSHOTS or not keys:
+        return {}
+
+    try:
+        snapshots = list(get_model().objects.filter(key__in=keys))
+    except DatabaseError:
+        logger.warning("Failed to load the metadata snapshots", exc_info=True)
+        return {}
+
+    entries = {}
+    for snapshot in snapshots:
+        entries[snapshot.key] = {
+            "data": snapshot.data,
+            "fresh_until": snapshot.fresh_until.timestamp(),
+        }
+        if snapshot.validators:
+            entries[snapshot.key]["validators"] = snapshot.validators
+    return entries
+
+
+def save_many(entries):
+    """Store the cache entries of the media metadata keys in the database."""
+    if not settings.METADATA_SNAPSHOTS:
+        return
+
+    model = get_model()
+    snapshots = []
+    for key, entry in entries.items():
+        parsed = parse_key(key)
+        if parsed is None:
+            continue
+        source, media_type, media_id, season_number = parsed
+        snapshots.append(
+            model(
+                key=key,
+                source=source,
+                media_type=media_type,
+                media_id=media_id,
+                season_number=season_number,
+                data=entry["data"],
+                validators=entry.get("validators", {}),
+                fresh_until=datetime.datetime.fromtimestamp(
+                    entry["fresh_until"],
+                    tz=datetime.UTC,
+                ),
+            ),
+        )
+    if not snapshots:
+        return
+
+    try:
+        # in a savepoint, a failed write would break the caller's transaction
+        with transaction.atomic():
+            model.objects.bulk_create(
+                snapshots,
+                update_conflicts=True,
+                unique_fields=["key"],
+                update_fields=["data", "validators", "fresh_until", "updated_at"],
+            )
+    except DatabaseError:
+        # Redis still has the metadata, only its durable copy is missing
+        logger.warning("Failed to save the metadata snapshots", exc_info=True)
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# credentials aren't part of the fixture keys, so any key replays the fixtures
+IGNORED_PARAMS = {"api_key", "client_id", "client_secret"}
+# response headers kept in the fixtures, the rest depend on the recording
+KEPT_HEADERS = {
+    "content-type",
+    "etag",
+    "last-modified",
+    "retry-after",
+    "x-ratelimit-limit",
+    "x-ratelimit-remaining",
+    "x-ratelimit-reset",
+}
+# request headers not forwarded to the providers when recording
+HOP_HEADERS = {"host", "content-length", "connection", "accept-encoding"}
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Stand-in for the provider APIs serving recorded responses.
+
+    Requests are sent to /<provider host>/<path>, e.g.
+    /api.themoviedb.org/3/movie/1, which PROVIDER_BASE_URL does for every
+    provider request. When recording, they're forwarded to the provider and
+    its responses are saved as fixtures.
+    """
+
+    daemon_threads = True
+
+    def __init__(  # noqa: PLR0913
+        self,
+        address,
+        fixtures,
+        *,
+        record=False,
+        latency=0,
+        rate_limit=0,
+        retry_after=1,
+    ):
+        """Serve the fixtures directory on the (host, port) address."""
+        super().__init__(address, StandInHandler)
+        self.fixtures = Path(fixtures)
+        self.record = record
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Handle a provider request with its recorded response."""
+
+    def do_GET(self):  # noqa: N802
+        """Handle a GET request."""
+        self.handle_provider_request()
+
+    def do_POST(self):  # noqa: N802
+        """Handle a POST request."""
+        self.handle_provider_request()
+
+    def handle_provider_request(self):
+        """Reply with the fixture of the request, recording it if needed."""
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        host, _, path = self.path.lstrip("/").partition("/")
+        path = f"/{path}"
+
+        if self.server.latency:
+            time.sleep(random.uniform(0, 2 * self.server.latency))  # noqa: S311
+
+        if random.random() < self.server.rate_limit:  # noqa: S311
+            self.send_fixture(
+                {
+                    "status": requests.codes.too_many_requests,
+                    "headers": {"Retry-After": str(self.server.retry_after)},
+                    "body": "",
+                },
+            )
+            return
+
+        fixture_file = get_fixture_file(
+            self.server.fixtures,
+            self.command,
+            host,
+            path,
+            body,
+        )
+        if self.server.record:
+            fixture = self.record_fixture(host, path, body)
+            fixture_file.parent.mkdir(parents=True, exist_ok=True)
+            fixture_file.write_text(json.dumps(fixture, indent=2))
+        elif fixture_file.exists():
+            fixture = json.loads(fixture_file.read_text())
+        else:
+            logger.warning("No fixture for %s %s%s", self.command, host, path)
+            fixture = {
+                "status": requests.codes.not_found,
+                "headers": {"Content-Type": "application/json"},
+                "body": json.dumps({"message": "No fixture recorded"}),
+            }
+
+        self.send_fixture(fixture)
+
+    def record_fixture(self, host, path, body):
+        """Forward the request to the provider and return its fixture."""
+        response = requests.request(
+            self.command,
+            f"https://{host}{path}",
+            headers={
+                name: value
+                for name, value in self.headers.items()
+                if name.lower() not in HOP_HEADERS
+            },
+            data=body,
+            timeout=settings.REQUEST_TIMEOUT,
+        )
+        return {
+            "request": {"method": self.command, "url": f"{host}{strip_query(path)}"},
+            "status": response.status_code,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() in KEPT_HEADERS
+            },
+            "body": response.text,
+        }
+
+    def send_fixture(self, fixture):
+        """Send the status, headers and body of the fixture."""
+        body = fixture["body"].encode()
+        self.send_response(fixture["status"])
+        for name, value in fixture["headers"].items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        """Log the requests with the logging module instead of stderr."""
+        logger.debug(format, *args)
+
+
+def strip_query(path):
+    """Return the path with the credentials removed from its query, sorted."""
+    url = urlsplit(path)
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(url.query, keep_blank_values=True)
+        if name not in IGNORED_PARAMS
+    )
+    if not params:
+        return url.path
+    return f"{url.path}?{urlencode(params)}"
+
+
+def get_fixture_file(fixtures, method, host, path, body):
+    """Return the fixture file of a request."""
+    key = hashlib.sha256(
+        f"{method} {strip_query(path)}\n".encode() + body,
+    ).hexdigest()[:20]
+    return Path(fixtures) / host / f"{key}.json"
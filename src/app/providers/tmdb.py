@@ -1,18 +1,34 @@
+import asyncio
+import logging
+
+import requests
 from django.conf import settings
-from django.core.cache import cache
 
-from app.providers import services
+from app.providers import caching, circuitbreaker, ratelimit, services
+
+logger = logging.getLogger(__name__)
 
 base_url = "https://api.themoviedb.org/3"
 base_params = {
     "api_key": settings.TMDB_API,
     "language": settings.TMDB_LANG,
 }
+# responses appended to a request by append_to_response at most
+MAX_APPENDED = 20
+# fields of the season episodes that are cached, the rest are dropped
+EPISODE_FIELDS = (
+    "episode_number",
+    "name",
+    "air_date",
+    "still_path",
+    "overview",
+    "runtime",
+)
 
 
 def search(media_type, query):
     """Search for media on TMDB."""
-    data = cache.get(f"search_{media_type}_{query}")
+    data = caching.get_search(f"search_{media_type}", query)
 
     if data is None:
         url = f"{base_url}/search/{media_type}"
@@ -25,9 +41,23 @@ def search(media_type, query):
         if settings.TMDB_NSFW:
             params["include_adult"] = "true"
 
-        response = services.api_request("TMDB", "GET", url, params=params)
+        try:
+            response = services.api_request("TMDB", "GET", url, params=params)
+        except (
+            requests.exceptions.RequestException,
+            services.DeadlineExceededError,
+            ratelimit.RateLimitedError,
+            circuitbreaker.ProviderUnavailableError,
+        ):
+            # imported here as app.models imports this module
+            from app import catalog
+
+            data = catalog.search(media_type, query)
+            if not data:
+                raise
+            logger.warning("TMDB search failed, using the catalog for %s", query)
+            return data
 
-        response = response["results"]
         data = [
             {
                 "media_id": media["id"],
@@ -36,113 +66,145 @@ def search(media_type, query):
                 "title": get_title(media),
                 "image": get_image_url(media["poster_path"]),
             }
-            for media in response
+            for media in response["results"]
         ]
 
-        cache.set(f"search_{media_type}_{query}", data)
+        caching.set_search(f"search_{media_type}", query, data)
 
     return data
 
 
 def movie(media_id):
     """Return the metadata for the selected movie from The Movie Database."""
-    data = cache.get(f"movie_{media_id}")
-
-    if data is None:
-        url = f"{base_url}/movie/{media_id}"
-        params = {
-            **base_params,
-            "append_to_response": "recommendations",
-        }
-        response = services.api_request("TMDB", "GET", url, params=params)
-        data = {
-            "media_id": media_id,
-            "source": "tmdb",
-            "media_type": "movie",
-            "title": response["title"],
-            "max_progress": 1,
-            "image": get_image_url(response["poster_path"]),
-            "synopsis": get_synopsis(response["overview"]),
-            "details": {
-                "format": "Movie",
-                "release_date": get_start_date(response["release_date"]),
-                "status": response["status"],
-                "runtime": get_readable_duration(response["runtime"]),
-                "genres": get_genres(response["genres"]),
-                "studios": get_companies(response["production_companies"]),
-                "country": get_country(response["production_countries"]),
-                "languages": get_languages(response["spoken_languages"]),
-            },
-            "related": {
-                "recommendations": get_related(
-                    response["recommendations"]["results"][:15],
-                ),
-            },
-        }
-
-        cache.set(f"movie_{media_id}", data)
-
-    return data
+    return caching.get_or_fetch(f"movie_{media_id}", fetch_movie, media_id)
 
 
-def tv_with_seasons(media_id, season_numbers):
-    """Return the metadata for the tv show with a season appended to the response."""
-    url = f"{base_url}/tv/{media_id}"
+def fetch_movie(media_id):
+    """Request and process the metadata for a movie from The Movie Database."""
+    url = f"{base_url}/movie/{media_id}"
     params = {
         **base_params,
         "append_to_response": "recommendations",
     }
+    response = services.api_request("TMDB", "GET", url, params=params)
+    return {
+        "media_id": media_id,
+        "source": "tmdb",
+        "media_type": "movie",
+        "title": response["title"],
+        "max_progress": 1,
+        "image": get_image_url(response["poster_path"]),
+        "synopsis": get_synopsis(response["overview"]),
+        "details": {
+            "format": "Movie",
+            "release_date": get_start_date(response["release_date"]),
+            "status": response["status"],
+            "runtime": get_readable_duration(response["runtime"]),
+            "genres": get_genres(response["genres"]),
+            "studios": get_companies(response["production_companies"]),
+            "country": get_country(response["production_countries"]),
+            "languages": get_languages(response["spoken_languages"]),
+        },
+        "related": {
+            "recommendations": get_related(
+                response["recommendations"]["results"][:15],
+            ),
+        },
+    }
 
-    data = cache.get(f"tv_{media_id}")
-    if data is None:
-        response = services.api_request("TMDB", "GET", url, params=params)
-        data = process_tv(response)
-        cache.set(f"tv_{media_id}", data)
 
-    uncached_seasons = []
-    for season_number in season_numbers:
-        season_data = cache.get(f"season_{media_id}_{season_number}")
+def tv_with_seasons(media_id, season_numbers):
+    """Return the metadata for the tv show with a season appended to the response.
 
-        if season_data:
-            data[f"season/{season_number}"] = season_data
-        else:
-            uncached_seasons.append(season_number)
+    The uncached show and seasons are requested together, appending up to
+    MAX_APPENDED seasons and the recommendations to each request.
+    """
+    url = f"{base_url}/tv/{media_id}"
+    tv_key = f"tv_{media_id}"
+    season_keys = {
+        season_number: f"season_{media_id}_{season_number}"
+        for season_number in season_numbers
+    }
+
+    cached = caching.get_many_cached(
+        {
+            tv_key: (fetch_tv, (media_id,)),
+            **{
+                key: (fetch_season, (media_id, season_number))
+                for season_number, key in season_keys.items()
+            },
+        },
+    )
+    uncached_seasons = [
+        season_number
+        for season_number, key in season_keys.items()
+        if not cached.get(key)
+    ]
 
-    # tmdb max remote request is 20
-    max_seasons_per_request = 20
-    for i in range(0, len(uncached_seasons), max_seasons_per_request):
-        season_subset = uncached_seasons[i : i + max_seasons_per_request]
-        append_text = ",".join([f"season/{season}" for season in season_subset])
-        params["append_to_response"] = f"{append_text}"
+    # the first request also fetches the show when it isn't cached
+    appended = [f"season/{season_number}" for season_number in uncached_seasons]
+    if tv_key not in cached:
+        appended.insert(0, "recommendations")
+    chunks = [
+        appended[i : i + MAX_APPENDED] for i in range(0, len(appended), MAX_APPENDED)
+    ]
+    responses = services.run_async(get_appended_chunks(url, chunks))
 
-        response = services.api_request("TMDB", "GET", url, params=params)
+    fetched = {}
+    if tv_key in cached:
+        # copy the shared cached metadata before adding the seasons
+        data = {**cached[tv_key]}
+    else:
+        fetched[tv_key] = process_tv(responses[0])
+        data = {**fetched[tv_key]}
 
-        # add seasons metadata to the response
-        for season_number in season_subset:
-            season_data = process_season(
-                response[f"season/{season_number}"],
-            )
+    for season_number in season_numbers:
+        key = season_keys[season_number]
+        if cached.get(key):
+            data[f"season/{season_number}"] = cached[key]
+
+    for chunk, response in zip(chunks, responses, strict=True):
+        for append in chunk:
+            if append == "recommendations":
+                continue
+            season_number = int(append.removeprefix("season/"))
+            season_data = process_season(response[append])
             season_data["tv_title"] = data["title"]
-            cache.set(f"season_{media_id}_{season_number}", season_data)
-            data[f"season/{season_number}"] = season_data
+            fetched[season_keys[season_number]] = season_data
+            data[append] = season_data
+
+    caching.set_many_cached(fetched)
     return data
 
 
+async def get_appended_chunks(url, chunks):
+    """Request the show with every chunk of appended responses concurrently."""
+    calls = [
+        services.async_api_request(
+            "TMDB",
+            "GET",
+            url,
+            params={**base_params, "append_to_response": ",".join(chunk)},
+        )
+        for chunk in chunks
+    ]
+    return await asyncio.gather(*calls)
+
+
 def tv(media_id):
     """Return the metadata for the selected tv show from The Movie Database."""
-    data = cache.get(f"tv_{media_id}")
+    return caching.get_or_fetch(f"tv_{media_id}", fetch_tv, media_id)
 
-    if data is None:
-        url = f"{base_url}/tv/{media_id}"
-        params = {
-            **base_params,
-            "append_to_response": "recommendations",
-        }
-        response = services.api_request("TMDB", "GET", url, params=params)
-        data = process_tv(response)
-        cache.set(f"tv_{media_id}", data)
 
-    return data
+def fetch_tv(media_id):
+    """Request and process the metadata for a tv show from The Movie Database."""
+    url = f"{base_url}/tv/{media_id}"
+    params = {
+        **base_params,
+        "append_to_response": "recommendations",
+    }
+    response = services.api_request("TMDB", "GET", url, params=params)
+    return process_tv(response)
 
 
 def process_tv(response):
@@ -180,15 +242,19 @@ def process_tv(response):
 
 def season(tv_id, season_number):
     """Return the metadata for the selected season from The Movie Database."""
-    data = cache.get(f"season_{tv_id}_{season_number}")
+    return caching.get_or_fetch(
+        f"season_{tv_id}_{season_number}",
+        fetch_season,
+        tv_id,
+        season_number,
+    )
 
-    if data is None:
-        url = f"{base_url}/tv/{tv_id}/season/{season_number}"
-        response = services.api_request("TMDB", "GET", url, params=base_params)
-        data = process_season(response)
-        cache.set(f"season_{tv_id}_{season_number}", data)
 
-    return data
+def fetch_season(tv_id, season_number):
+    """Request and process the metadata for a season from The Movie Database."""
+    url = f"{base_url}/tv/{tv_id}/season/{season_number}"
+    response = services.api_request("TMDB", "GET", url, params=base_params)
+    return process_season(response)
 
 
 def process_season(response):
@@ -205,10 +271,48 @@ def process_season(response):
             "first_air_date": get_start_date(response["air_date"]),
             "number_of_episodes": num_episodes,
         },
-        "episodes": response["episodes"],
+        "episodes": trim_episodes(response["episodes"]),
     }
 
 
+def trim_episodes(episodes):
+    """Keep only the episode fields that are used, to keep the cache small."""
+    return [
+        {field: episode.get(field) for field in EPISODE_FIELDS} for episode in episodes
+    ]
+
+
+def changed_keys(changed_ids):
+    """Return the cached keys of the movies and tv shows with the changed ids.
+
+    changed_ids holds the ids of each media type, movie and tv.
+    """
+    keys = []
+    for key in caching.scan_cached_keys("movie_*", "tv_*", "season_*"):
+        prefix, media_id = key.split("_")[:2]
+        media_type = "movie" if prefix == "movie" else "tv"
+        if int(media_id) in changed_ids[media_type]:
+            keys.append(key)
+    return keys
+
+
+def changes(media_type, start_date):
+    """Return the ids of the media changed on TMDB since the date."""
+    url = f"{base_url}/{media_type}/changes"
+    ids = set()
+    page = 1
+    total_pages = 1
+
+    while page <= total_pages:
+        params = {**base_params, "start_date": start_date.isoformat(), "page": page}
+        response = services.api_request("TMDB", "GET", url, params=params)
+        ids.update(result["id"] for result in response["results"])
+        total_pages = response["total_pages"]
+        page += 1
+
+    return ids
+
+
 def get_format(media_type):
     """Return media_type capitalized."""
     if media_type == "tv":
@@ -0,0 +1,122 @@
+import datetime
+import logging
+
+import requests
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from app import catalog, images, warmup
+from app.providers import caching, services, tmdb
+from config.celery import ProviderTask
+
+logger = logging.getLogger(__name__)
+
+TMDB_CHANGES_KEY = "tmdb_changes_synced"
+TMDB_CHANGES_MAX_DAYS = 14  # oldest start date accepted by the changes endpoints
+
+
+@shared_task(base=ProviderTask, name="Refresh metadata")
+def refresh_metadata(key, fetch_path, args):
+    """Fetch stale metadata again and replace it in the cache."""
+    fetch = import_string(fetch_path)
+    try:
+        caching.refresh_cached(key, fetch, *args)
+    finally:
+        services.get_redis().delete(f"refresh:{cache.make_key(key)}")
+
+    logger.info("Refreshed metadata for %s", key)
+    return f"Refreshed metadata for {key}"
+
+
+@shared_task(base=ProviderTask, name="Sync TMDB changes")
+def sync_tmdb_changes():
+    """Mark the cached TMDB metadata changed since the last sync as stale."""
+    today = datetime.datetime.now(tz=datetime.UTC).date()
+    oldest = today - datetime.timedelta(days=TMDB_CHANGES_MAX_DAYS)
+    # date of the last sync and the ids it got, marked stale once already
+    synced = cache.get(
+        TMDB_CHANGES_KEY,
+        {"date": today - datetime.timedelta(days=1), "ids": {"movie": (), "tv": ()}},
+    )
+
+    start_date = synced["date"]
+    if start_date < oldest:
+        logger.warning("Last TMDB changes sync is too old, starting from %s", oldest)
+        start_date = oldest
+
+    changed_ids = {
+        "movie": tmdb.changes("movie", start_date),
+        "tv": tmdb.changes("tv", start_date),
+    }
+    # the start date is inclusive, skip the ids a sync of the same day already
+    # marked as stale so they aren't refetched after every sync of the day,
+    # on a new day they may have changed again
+    if synced["date"] == today:
+        new_ids = {
+            media_type: ids.difference(synced["ids"][media_type])
+            for media_type, ids in changed_ids.items()
+        }
+    else:
+        new_ids = changed_ids
+    expired = caching.expire_cached(*tmdb.changed_keys(new_ids))
+    cache.set(
+        TMDB_CHANGES_KEY,
+        {"date": today, "ids": changed_ids},
+        settings.METADATA_HARD_TTL,
+    )
+
+    logger.info("Marked %s changed TMDB entries as stale", expired)
+    return f"Marked {expired} changed TMDB entries as stale"
+
+
+@shared_task(name="Import TMDB exports")
+def import_tmdb_exports():
+    """Import the latest TMDB daily ID exports of TMDB_EXPORT_DIR."""
+    if not settings.TMDB_EXPORT_DIR:
+        return "TMDB_EXPORT_DIR isn't set, no exports to import"
+
+    paths = catalog.get_latest_exports(settings.TMDB_EXPORT_DIR)
+    imported = sum(catalog.import_export(path) for path in paths)
+    return f"Imported {imported} catalog entries from {len(paths)} exports"
+
+
+@shared_task(name="Resize image")
+def resize_image(url, variant):
+    """Cache the WebP variant of a provider image."""
+    try:
+        images.get_variant(url, variant)
+    except (
+        requests.exceptions.RequestException,
+        ValueError,
+        OSError,
+        Image.DecompressionBombError,
+    ) as error:
+        logger.warning("Failed to resize %s, using the original: %s", url, error)
+        return f"Failed to resize {url}"
+    return f"Cached the {variant} variant of {url}"
+
+
+@shared_task(name="Clean image cache")
+def clean_image_cache():
+    """Delete the oldest resized images once the cache is over IMAGE_CACHE_SIZE."""
+    deleted = images.clean_cache()
+    return f"Deleted {deleted} cached images"
+
+
+@shared_task(base=ProviderTask, bind=True, name="Warm metadata")
+def warm_metadata(self, *, restart=False):
+    """Cache the metadata of every tracked media, resuming the last run."""
+    progress = warmup.warm_metadata(
+        restart=restart,
+        on_progress=lambda progress: self.update_state(
+            state="PROGRESS",
+            meta=progress,
+        ),
+    )
+    return (
+        f"Warmed the metadata of {progress['total']} media, "
+        f"{progress['failed']} failed"
+    )
@@ -1,7 +1,11 @@
+from urllib.parse import urlencode
+
 from django import template
+from django.conf import settings
+from django.urls import reverse
 from unidecode import unidecode
 
-from app import helpers
+from app import helpers, images
 
 register = template.Library()
 
@@ -38,3 +42,11 @@ def slug(arg1):
 def format_time(total_minutes):
     """Convert total minutes to HH:MM format."""
     return helpers.minutes_to_hhmm(total_minutes)
+
+
+@register.filter()
+def proxy_image(url, variant):
+    """Return the URL of the resized WebP variant of a provider image."""
+    if not settings.IMAGE_PROXY or not images.is_proxied(url):
+        return url
+    return f"{reverse('image', args=[variant])}?{urlencode({'url': url})}"
@@ -1,11 +1,37 @@
+import datetime
+import gzip
 import json
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from io import StringIO
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+import requests
 from django.conf import settings
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
 
-from app.providers import igdb, mal, tmdb
+from app import catalog, tasks, warmup
+from app.models import STATUS_PLANNING, Anime, Item, MetadataSnapshot, Movie
+from app.providers import (
+    caching,
+    circuitbreaker,
+    igdb,
+    mal,
+    mangaupdates,
+    metrics,
+    ratelimit,
+    serializers,
+    services,
+    snapshots,
+    standin,
+    tmdb,
+)
 
 mock_path = Path(__file__).resolve().parent / "mock_data"
 
@@ -130,3 +156,1464 @@ class Metadata(TestCase):
         self.assertEqual(response["details"]["format"], "Main game")
         self.assertEqual(response["details"]["release_date"], "2015-05-19")
         self.assertEqual(response["details"]["themes"], "Action, Fantasy, Open world")
+
+
+class AsyncClient(TestCase):
+    """Test the pooled asynchronous provider client."""
+
+    def test_session_reused(self):
+        """Test that the aiohttp session is shared between calls."""
+
+        async def get_session():
+            return services.get_async_session()
+
+        first = services.run_async(get_session())
+        second = services.run_async(get_session())
+        self.assertIs(first, second)
+
+    @patch("app.providers.services.async_api_request", new_callable=AsyncMock)
+    def test_mangaupdates_fan_out(self, mock_request):
+        """Test that related series are fetched through the async client."""
+        series = {
+            "title": "Berserk",
+            "image": {"url": {"original": None}},
+            "description": "",
+            "completed": False,
+            "type": "Manga",
+            "authors": [],
+            "year": "1989",
+            "status": "",
+            "latest_chapter": 370,
+            "genres": [],
+            "related_series": [
+                {"related_series_id": 1, "related_series_name": "Related"},
+            ],
+            "recommendations": [
+                {"series_id": 2, "series_name": "Recommended"},
+                {"series_id": 3, "series_name": None},
+            ],
+        }
+        mock_request.side_effect = [
+            series,
+            {"image": {"url": {"original": "related.jpg"}}},
+            {"image": {"url": {"original": "recommended.jpg"}}},
+        ]
+
+        response = mangaupdates.manga("51239621230")
+        self.assertEqual(mock_request.await_count, 3)
+        related = response["related"]["related_manga"]
+        self.assertEqual(related[0]["image"], "related.jpg")
+        self.assertEqual(
+            response["related"]["recommendations"],
+            [{"media_id": 2, "title": "Recommended", "image": "recommended.jpg"}],
+        )
+
+
+class SingleFlight(TestCase):
+    """Test the coalescing of concurrent cache misses."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    def test_concurrent_misses(self):
+        """Test that concurrent misses of a key only fetch once."""
+        calls = []
+
+        def fetch(media_id):
+            calls.append(media_id)
+            time.sleep(0.3)
+            return {"media_id": media_id}
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    caching.get_or_fetch("single_flight_1", fetch, 1),
+                ),
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [{"media_id": 1}] * 5)
+
+    def test_wait_for_other_process(self):
+        """Test that a caller waits for the lock holder to fill the cache."""
+        lock_name = f"lock:{cache.make_key('single_flight_2')}"
+        token = caching.acquire_lock(lock_name)
+        threading.Timer(0.3, cache.set, ("single_flight_2", {"media_id": 2})).start()
+
+        def fetch(_):
+            self.fail("The value should be read from the cache")
+
+        data = caching.get_or_fetch("single_flight_2", fetch, 2)
+        caching.release_lock(lock_name, token)
+        self.assertEqual(data, {"media_id": 2})
+
+
+def fetch_fresh(media_id):
+    """Return fresh metadata for the stale-while-revalidate tests."""
+    return {"media_id": media_id, "title": "Fresh"}
+
+
+class StaleWhileRevalidate(TestCase):
+    """Test serving stale metadata while it's refreshed."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    @override_settings(METADATA_SOFT_TTL=-1)
+    @patch("app.tasks.refresh_metadata.delay")
+    def test_stale_served(self, mock_delay):
+        """Test that stale metadata is returned and a refresh queued once."""
+        caching.set_cached("swr_1", {"media_id": 1, "title": "Stale"})
+
+        for _ in range(2):
+            data = caching.get_or_fetch("swr_1", fetch_fresh, 1)
+            self.assertEqual(data["title"], "Stale")
+
+        mock_delay.assert_called_once_with(
+            "swr_1",
+            "app.tests.test_providers.fetch_fresh",
+            (1,),
+        )
+
+    def test_legacy_entry_refreshed(self):
+        """Test that plain cached metadata is served and refreshed."""
+        cache.set("swr_2", {"media_id": 2, "title": "Stale"})
+
+        data = caching.get_or_fetch("swr_2", fetch_fresh, 2)
+        self.assertEqual(data["title"], "Stale")
+
+        # the refresh task runs eagerly in tests
+        data = caching.get_or_fetch("swr_2", fetch_fresh, 2)
+        self.assertEqual(data["title"], "Fresh")
+
+
+def fetch_conditional(media_id):
+    """Return metadata from a single request for the conditional request tests."""
+    return services.api_request(
+        "TMDB",
+        "GET",
+        f"https://api.themoviedb.org/3/movie/{media_id}",
+    )
+
+
+def mock_response(status_code, content=b"", headers=None):
+    """Return a requests response with the given status, content and headers."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content  # noqa: SLF001
+    response.headers.update(headers or {})
+    return response
+
+
+class ConditionalRequests(TestCase):
+    """Test refreshing cached metadata with conditional requests."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    @patch("requests.Session.get")
+    def test_not_modified_extends_entry(self, mock_get):
+        """Test that a 304 keeps the cached metadata for another soft TTL."""
+        mock_get.return_value = mock_response(
+            200,
+            b'{"title": "Cached"}',
+            {"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"},
+        )
+        with override_settings(METADATA_SOFT_TTL=-1):
+            caching.get_or_fetch("movie_1", fetch_conditional, 1)
+
+        mock_get.return_value = mock_response(304)
+        data = caching.refresh_cached("movie_1", fetch_conditional, 1)
+
+        self.assertEqual(data, {"title": "Cached"})
+        headers = mock_get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"v1"')
+        self.assertEqual(headers["If-Modified-Since"], "Wed, 01 Jan 2025 00:00:00 GMT")
+        entry = caching.load_entry("movie_1", cache.get("movie_1"))
+        self.assertGreater(entry["fresh_until"], time.time())
+
+    @patch("requests.Session.get")
+    def test_modified_replaces_entry(self, mock_get):
+        """Test that a changed response replaces the metadata and validators."""
+        mock_get.return_value = mock_response(200, b'{"title": "Old"}', {"ETag": "1"})
+        caching.get_or_fetch("movie_2", fetch_conditional, 2)
+
+        mock_get.return_value = mock_response(200, b'{"title": "New"}', {"ETag": "2"})
+        data = caching.refresh_cached("movie_2", fetch_conditional, 2)
+
+        self.assertEqual(data, {"title": "New"})
+        entry = caching.load_entry("movie_2", cache.get("movie_2"))
+        self.assertEqual(list(entry["validators"].values()), [{"etag": "2"}])
+
+    @patch("requests.Session.get")
+    def test_no_validators_outside_fetch(self, mock_get):
+        """Test that requests outside metadata fetches aren't conditional."""
+        mock_get.return_value = mock_response(200, b"{}", {"ETag": "1"})
+        services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/3")
+
+        self.assertIsNone(mock_get.call_args.kwargs["headers"])
+
+
+class TMDBChanges(TestCase):
+    """Test marking the cached TMDB metadata changed upstream as stale."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    @patch("app.providers.services.api_request")
+    def test_changes_pages(self, mock_request):
+        """Test that every page of the changes feed is read."""
+        mock_request.side_effect = [
+            {"results": [{"id": 1}, {"id": 2}], "page": 1, "total_pages": 2},
+            {"results": [{"id": 3}], "page": 2, "total_pages": 2},
+        ]
+
+        ids = tmdb.changes("tv", datetime.date(2025, 1, 1))
+
+        self.assertEqual(ids, {1, 2, 3})
+        self.assertEqual(mock_request.call_args.kwargs["params"]["page"], 2)
+
+    @patch("app.providers.tmdb.changes")
+    def test_sync_expires_changed(self, mock_changes):
+        """Test that only the changed movies, shows and their seasons are stale."""
+        mock_changes.side_effect = lambda media_type, _: (
+            {1} if media_type == "tv" else {2}
+        )
+        for key in ("tv_1", "season_1_1", "movie_2", "tv_2", "movie_1"):
+            caching.set_cached(key, {"key": key})
+
+        tasks.sync_tmdb_changes()
+
+        for key in ("tv_1", "season_1_1", "movie_2"):
+            entry = caching.load_entry(key, cache.get(key))
+            self.assertEqual(entry, {"data": {"key": key}, "fresh_until": 0})
+        for key in ("tv_2", "movie_1"):
+            entry = caching.load_entry(key, cache.get(key))
+            self.assertGreater(entry["fresh_until"], time.time())
+        self.assertEqual(
+            cache.get(tasks.TMDB_CHANGES_KEY),
+            {
+                "date": datetime.datetime.now(tz=datetime.UTC).date(),
+                "ids": {"movie": {2}, "tv": {1}},
+            },
+        )
+
+    @patch("app.providers.tmdb.changes")
+    def test_sync_changes_on_consecutive_days(self, mock_changes):
+        """Test that a change seen yesterday is marked stale again today."""
+        mock_changes.side_effect = lambda media_type, _: (
+            {1} if media_type == "tv" else set()
+        )
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        yesterday = today - datetime.timedelta(days=1)
+        cache.set(
+            tasks.TMDB_CHANGES_KEY,
+            {"date": yesterday, "ids": {"movie": set(), "tv": {1}}},
+        )
+        caching.set_cached("tv_1", {"key": "tv_1"})
+
+        tasks.sync_tmdb_changes()
+
+        mock_changes.assert_any_call("tv", yesterday)
+        entry = caching.load_entry("tv_1", cache.get("tv_1"))
+        self.assertEqual(entry["fresh_until"], 0)
+
+    @patch("app.providers.tmdb.changes")
+    def test_sync_skips_seen_changes(self, mock_changes):
+        """Test that the changes seen by the last sync of the day aren't expired."""
+        mock_changes.side_effect = lambda media_type, _: (
+            {1, 2} if media_type == "tv" else set()
+        )
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        cache.set(
+            tasks.TMDB_CHANGES_KEY,
+            {"date": today, "ids": {"movie": set(), "tv": {1}}},
+        )
+        for key in ("tv_1", "tv_2"):
+            caching.set_cached(key, {"key": key})
+
+        tasks.sync_tmdb_changes()
+
+        mock_changes.assert_any_call("tv", today)
+        entry = caching.load_entry("tv_1", cache.get("tv_1"))
+        self.assertGreater(entry["fresh_until"], time.time())
+        entry = caching.load_entry("tv_2", cache.get("tv_2"))
+        self.assertEqual(entry["fresh_until"], 0)
+
+
+class Catalog(TestCase):
+    """Test the catalog imported from the TMDB daily ID exports."""
+
+    export = mock_path / "movie_ids_10_17_2026.json.gz"
+
+    def setUp(self):
+        """Import the export fixture."""
+        call_command("import_tmdb_export", str(self.export), stdout=StringIO())
+
+    def write_export(self, directory, name, entries):
+        """Write an export file with the entries and return its path."""
+        path = Path(directory) / name
+        lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+        path.write_bytes(gzip.compress(lines.encode()))
+        return path
+
+    def test_prefix_search(self):
+        """Test that the entries are found by prefix, without the adult ones."""
+        results = catalog.search("movie", "fig")
+
+        self.assertEqual([result["media_id"] for result in results], [550])
+        self.assertEqual(results[0]["image"], settings.IMG_NONE)
+        self.assertEqual(catalog.search("tv", "fig"), [])
+
+    def test_popularity_order(self):
+        """Test that the most popular entries come first."""
+        results = catalog.search("movie", "f")
+
+        self.assertEqual([result["media_id"] for result in results], [13, 680, 550])
+
+    def test_latest_export(self):
+        """Test that the task imports the latest export and removes the rest."""
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_export(
+                directory,
+                "movie_ids_10_18_2026.json.gz",
+                [{"adult": False, "id": 13, "original_title": "Forrest Gump"}],
+            )
+            self.write_export(directory, "movie_ids_10_16_2026.json.gz", [])
+
+            with override_settings(TMDB_EXPORT_DIR=directory):
+                tasks.import_tmdb_exports()
+
+        self.assertEqual(
+            [result["media_id"] for result in catalog.search("movie", "f")],
+            [13],
+        )
+
+    def test_invalid_export_name(self):
+        """Test that files without the export name are rejected."""
+        with self.assertRaises(CommandError):
+            call_command("import_tmdb_export", str(mock_path / "catalog.json.gz"))
+
+    @patch("app.providers.services.api_request")
+    def test_search_fallback(self, mock_request):
+        """Test that the TMDB search uses the catalog when TMDB fails."""
+        mock_request.side_effect = requests.exceptions.ConnectionError
+        cache.clear()
+
+        results = tmdb.search("movie", "pulp fiction")
+        self.assertEqual([result["media_id"] for result in results], [680])
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            tmdb.search("movie", "unknown")
+
+
+class RateLimit(TestCase):
+    """Test the rate limits adapted to the provider responses."""
+
+    def setUp(self):
+        """Clear the pauses before and after each test, and the cache."""
+        services.get_redis().flushall()
+        self.addCleanup(services.get_redis().flushall)
+        cache.clear()
+
+    def test_pause_seconds(self):
+        """Test the pause requested by the different rate limit headers."""
+        self.assertEqual(ratelimit.get_pause_seconds({"Retry-After": "30"}), 30)
+        self.assertAlmostEqual(
+            ratelimit.get_pause_seconds(
+                {"Retry-After": formatdate(time.time() + 60, usegmt=True)},
+            ),
+            60,
+            delta=2,
+        )
+        self.assertAlmostEqual(
+            ratelimit.get_pause_seconds(
+                {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": time.time() + 10},
+            ),
+            10,
+            delta=1,
+        )
+        self.assertEqual(ratelimit.get_pause_seconds({"X-RateLimit-Remaining": "5"}), 0)
+
+    def test_adapt_limit(self):
+        """Test that the bucket follows the limit reported by the provider."""
+        adapter = ratelimit.AdaptiveLimiterAdapter(limit=10, interval=60)
+        services.session.mount("https://ratelimit.test", adapter)
+        self.addCleanup(services.session.adapters.pop, "https://ratelimit.test")
+
+        ratelimit.update_from_headers(
+            "https://ratelimit.test/a",
+            {"X-RateLimit-Limit": "90"},
+        )
+
+        self.assertEqual(adapter.rate.limit, 85)
+        self.assertEqual(adapter.rate.interval, 60)
+
+    @patch("app.providers.ratelimit.time.sleep")
+    @patch("requests.Session.get")
+    def test_retry_after(self, mock_get, mock_sleep):
+        """Test that a 429 pauses the host for the Retry-After seconds."""
+        mock_get.side_effect = [
+            mock_response(429, headers={"Retry-After": "5"}),
+            mock_response(200, b'{"title": "Retried"}'),
+        ]
+
+        response = services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/1")
+
+        self.assertEqual(response, {"title": "Retried"})
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 5, delta=1)
+
+    @patch("app.providers.caching.refresh_cached")
+    def test_task_retried(self, mock_refresh):
+        """Test that rate limited tasks are retried instead of waiting."""
+        mock_refresh.side_effect = [
+            ratelimit.RateLimitedError("api.themoviedb.org", 60),
+            {"title": "Refreshed"},
+        ]
+
+        tasks.refresh_metadata.delay("movie_1", "app.providers.tmdb.fetch_movie", (1,))
+
+        self.assertEqual(mock_refresh.call_count, 2)
+
+    def test_fail_fast(self):
+        """Test that long pauses raise when the caller can't wait."""
+        ratelimit.pause_host("api.themoviedb.org", 60)
+
+        token = ratelimit.wait_on_rate_limit.set(False)
+        try:
+            with self.assertRaises(ratelimit.RateLimitedError):
+                services.api_request(
+                    "TMDB",
+                    "GET",
+                    "https://api.themoviedb.org/3/movie/1",
+                )
+        finally:
+            ratelimit.wait_on_rate_limit.reset(token)
+
+    @patch("app.providers.services.time.sleep")
+    @patch("app.providers.services.get_retry_delay", return_value=0)
+    @patch("requests.Session.get")
+    def test_backoff(self, mock_get, mock_delay, _):
+        """Test that server errors are retried with backoff and 404s aren't."""
+        mock_get.side_effect = [
+            mock_response(503),
+            mock_response(503),
+            mock_response(200, b"{}"),
+        ]
+        services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/1")
+        self.assertEqual(mock_delay.call_args_list, [((0, 1),), ((1, 1),)])
+        self.assertLessEqual(ratelimit.backoff_delay(1), 2)
+
+        mock_delay.reset_mock()
+        mock_get.side_effect = [mock_response(404)]
+        with self.assertRaises(requests.exceptions.HTTPError):
+            services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/1")
+        mock_delay.assert_not_called()
+
+
+class CircuitBreaker(TestCase):
+    """Test skipping the requests to failing providers."""
+
+    def setUp(self):
+        """Clear the circuits before and after each test."""
+        services.get_redis().flushall()
+        self.addCleanup(services.get_redis().flushall)
+
+    @override_settings(CIRCUIT_BREAKER_THRESHOLD=2)
+    @patch("app.providers.services.time.sleep")
+    @patch("requests.Session.get")
+    def test_opens_after_failures(self, mock_get, _):
+        """Test that the circuit opens and later requests fail fast."""
+        mock_get.side_effect = requests.exceptions.ConnectionError
+
+        with self.assertRaises(circuitbreaker.ProviderUnavailableError):
+            services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/1")
+        with self.assertRaises(circuitbreaker.ProviderUnavailableError):
+            services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/2")
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    @override_settings(CIRCUIT_BREAKER_THRESHOLD=3)
+    def test_half_open(self):
+        """Test that a failure after the timeout opens the circuit again."""
+        circuitbreaker.open_circuit("TMDB")
+        services.get_redis().delete(circuitbreaker.OPEN_KEY.format(provider="TMDB"))
+        circuitbreaker.check("TMDB")
+
+        circuitbreaker.record_failure("TMDB")
+
+        with self.assertRaises(circuitbreaker.ProviderUnavailableError):
+            circuitbreaker.check("TMDB")
+
+    @override_settings(CIRCUIT_BREAKER_THRESHOLD=2)
+    def test_success_resets(self):
+        """Test that a successful response resets the failures."""
+        circuitbreaker.record_failure("MAL")
+        circuitbreaker.record_success("MAL")
+        circuitbreaker.record_failure("MAL")
+
+        circuitbreaker.check("MAL")
+
+
+class Deadline(TestCase):
+    """Test the time budget of the provider requests."""
+
+    def set_deadline(self, seconds):
+        """Set the deadline of the test to the seconds from now."""
+        token = services.request_deadline.set(time.monotonic() + seconds)
+        self.addCleanup(services.request_deadline.reset, token)
+
+    def test_background_timeouts(self):
+        """Test that requests without a deadline use the background timeouts."""
+        self.assertEqual(
+            services.get_timeout("TMDB"),
+            settings.PROVIDER_TIMEOUTS["default"]["background"],
+        )
+
+    def test_timeouts_within_deadline(self):
+        """Test that the timeouts don't go past the deadline."""
+        self.set_deadline(2)
+
+        connect, read = services.get_timeout("MANGAUPDATES")
+
+        self.assertLessEqual(connect, 2)
+        self.assertLessEqual(read, 2)
+
+    @patch("requests.Session.get")
+    def test_spent_deadline(self, mock_get):
+        """Test that requests are skipped once the deadline is spent."""
+        self.set_deadline(0)
+
+        with self.assertRaises(services.DeadlineExceededError):
+            services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/1")
+
+        mock_get.assert_not_called()
+
+    @patch("app.providers.services.get_async_session")
+    def test_skip_fan_out(self, mock_session):
+        """Test that the related series are skipped once the deadline is spent."""
+        self.set_deadline(0)
+
+        data = services.run_async(
+            mangaupdates.fetch_series_data(
+                "https://api.mangaupdates.com/v1/series/1",
+                {"series_id": 1, "series_name": "Skipped"},
+            ),
+        )
+
+        self.assertIsNone(data)
+        mock_session.assert_not_called()
+
+    @patch("app.providers.services.get_async_session")
+    def test_skipped_fan_out_cached_stale(self, mock_session):
+        """Test that metadata missing the skipped related series is stored stale."""
+        self.addCleanup(cache.delete, "mangaupdates_manga_1")
+
+        async def fetch_manga():
+            related = await mangaupdates.fetch_series_data(
+                "https://api.mangaupdates.com/v1/series/2",
+                {"series_id": 2, "series_name": "Skipped"},
+            )
+            return {"related": [related] if related else []}
+
+        self.set_deadline(0)
+        data = caching.get_or_fetch("mangaupdates_manga_1", fetch_manga)
+
+        self.assertEqual(data, {"related": []})
+        entry = caching.load_entry(
+            "mangaupdates_manga_1",
+            cache.get("mangaupdates_manga_1"),
+        )
+        self.assertEqual(entry["fresh_until"], 0)
+        mock_session.assert_not_called()
+
+
+class SearchAll(TestCase):
+    """Test the search of every media type at once."""
+
+    def search_result(self, media_type):
+        """Return a search result of the media type."""
+        return [{"media_id": 1, "media_type": media_type, "title": media_type}]
+
+    @patch("app.providers.igdb.search")
+    @patch("app.providers.mangaupdates.search")
+    @patch("app.providers.mal.search")
+    @patch("app.providers.tmdb.search")
+    def test_results_by_type(self, mock_tmdb, mock_mal, mock_mangaupdates, mock_igdb):
+        """Test that the results are returned in order, without the failures."""
+        mock_tmdb.side_effect = lambda media_type, _: self.search_result(media_type)
+        mock_mal.side_effect = lambda media_type, _: self.search_result(media_type)
+        mock_mangaupdates.side_effect = requests.exceptions.ConnectionError
+        mock_igdb.return_value = self.search_result("game")
+
+        results, failed = services.search_all("test")
+
+        self.assertEqual(list(results), ["TV", "Movie", "Anime", "Manga", "Game"])
+        self.assertEqual(results["Anime"], self.search_result("anime"))
+        self.assertEqual(failed, ["Manga (MangaUpdates)"])
+
+    @override_settings(SEARCH_DEADLINE=0)
+    @patch("requests.Session.get")
+    def test_spent_deadline(self, mock_get):
+        """Test that the searches are skipped once the deadline is spent."""
+        cache.clear()
+        caching.local_cache.clear()
+
+        results, failed = services.search_all("deadline")
+
+        self.assertEqual(results, {})
+        self.assertEqual(failed, list(services.SEARCHES))
+        mock_get.assert_not_called()
+
+
+class StandIn(TestCase):
+    """Test the stand-in server of the provider APIs."""
+
+    def start_server(self, **kwargs):
+        """Start a stand-in server on a free port and return its URL."""
+        fixtures = tempfile.TemporaryDirectory()
+        self.addCleanup(fixtures.cleanup)
+        self.fixtures = Path(fixtures.name)
+
+        server = standin.StandInServer(("127.0.0.1", 0), self.fixtures, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def test_request_url(self):
+        """Test that provider URLs are sent to the stand-in server."""
+        with override_settings(PROVIDER_BASE_URL="http://standin:8001/"):
+            self.assertEqual(
+                services.get_request_url("https://api.themoviedb.org/3/movie/1?a=1"),
+                "http://standin:8001/api.themoviedb.org/3/movie/1?a=1",
+            )
+
+        self.assertEqual(
+            services.get_request_url("https://api.themoviedb.org/3/movie/1"),
+            "https://api.themoviedb.org/3/movie/1",
+        )
+
+    def test_replay(self):
+        """Test that recorded responses are served whatever the API key."""
+        base_url = self.start_server()
+        fixture_file = standin.get_fixture_file(
+            self.fixtures,
+            "GET",
+            "api.themoviedb.org",
+            "/3/movie/1?api_key=recorded",
+            b"",
+        )
+        fixture_file.parent.mkdir()
+        fixture_file.write_text(
+            json.dumps(
+                {
+                    "status": 200,
+                    "headers": {"Content-Type": "application/json"},
+                    "body": json.dumps({"id": 1, "title": "Recorded"}),
+                },
+            ),
+        )
+
+        with override_settings(PROVIDER_BASE_URL=base_url):
+            response = services.api_request(
+                "TMDB",
+                "GET",
+                "https://api.themoviedb.org/3/movie/1",
+                params={"api_key": "other"},
+            )
+
+        self.assertEqual(response["title"], "Recorded")
+
+    def test_record(self):
+        """Test that responses from the provider are saved as fixtures."""
+        base_url = self.start_server(record=True)
+        provider_response = requests.Response()
+        provider_response.status_code = 200
+        provider_response.headers["Content-Type"] = "application/json"
+        provider_response.headers["Set-Cookie"] = "session=1"
+        provider_response._content = b'{"id": 1}'  # noqa: SLF001
+
+        with patch(
+            "app.providers.standin.requests.request",
+            return_value=provider_response,
+        ) as mock_request:
+            requests.get(f"{base_url}/api.myanimelist.net/v2/anime/1", timeout=5)
+
+        self.assertEqual(
+            mock_request.call_args.args,
+            ("GET", "https://api.myanimelist.net/v2/anime/1"),
+        )
+        fixture = json.loads(
+            standin.get_fixture_file(
+                self.fixtures,
+                "GET",
+                "api.myanimelist.net",
+                "/v2/anime/1",
+                b"",
+            ).read_text(),
+        )
+        self.assertEqual(fixture["body"], '{"id": 1}')
+        self.assertEqual(fixture["headers"], {"Content-Type": "application/json"})
+
+    def test_missing_fixture(self):
+        """Test that requests without a fixture get a not found response."""
+        base_url = self.start_server()
+
+        response = requests.get(f"{base_url}/api.igdb.com/v4/games", timeout=5)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_rate_limit_injection(self):
+        """Test that the configured fraction of requests gets a 429 response."""
+        base_url = self.start_server(rate_limit=1, retry_after=7)
+
+        response = requests.get(f"{base_url}/api.igdb.com/v4/games", timeout=5)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "7")
+
+
+class SearchCache(TestCase):
+    """Test the normalized search cache."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+
+    def search_response(self, titles):
+        """Return a TMDB search response with the titles."""
+        return {
+            "results": [
+                {"id": media_id, "name": title, "poster_path": None}
+                for media_id, title in enumerate(titles)
+            ],
+            "total_results": len(titles),
+        }
+
+    def test_normalize_query(self):
+        """Test that case, spaces and Latin accents are normalized."""
+        self.assertEqual(
+            caching.normalize_query("  NARUTO  Shippūden "),
+            "naruto shippuden",
+        )
+        self.assertEqual(caching.normalize_query("Pokémon"), "pokemon")
+        self.assertEqual(caching.normalize_query("ナルト"), "ナルト")
+
+    @patch("app.providers.services.api_request")
+    def test_same_query(self, mock_request):
+        """Test that variants of a query share the cached results."""
+        mock_request.return_value = self.search_response(["Naruto"])
+
+        for query in ("Naruto", "naruto ", "NARUTO"):
+            self.assertEqual(tmdb.search("tv", query)[0]["title"], "Naruto")
+
+        mock_request.assert_called_once()
+
+    @patch("app.providers.services.api_request")
+    def test_longer_query(self, mock_request):
+        """Test that longer queries aren't served from shorter ones."""
+        mock_request.return_value = self.search_response([])
+        tmdb.search("tv", "batm")
+
+        mock_request.return_value = self.search_response(["Batman"])
+        results = tmdb.search("tv", "batman")
+
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual([result["title"] for result in results], ["Batman"])
+
+
+class NotFound(TestCase):
+    """Test remembering not found responses and empty searches."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    @patch("requests.Session.get")
+    def test_cached_not_found(self, mock_get):
+        """Test that a not found request isn't sent again."""
+        mock_get.return_value = mock_response(404, b'{"status_code": 34}')
+
+        with self.assertRaises(requests.exceptions.HTTPError) as first:
+            tmdb.movie(999999999)
+        with self.assertRaises(services.CachedNotFoundError) as second:
+            tmdb.movie(999999999)
+
+        mock_get.assert_called_once()
+        self.assertNotIsInstance(first.exception, services.CachedNotFoundError)
+        self.assertEqual(second.exception.response.status_code, 404)
+        self.assertEqual(second.exception.response.json(), {"status_code": 34})
+
+    @override_settings(METADATA_NOT_FOUND_TTL=0)
+    @patch("requests.Session.get")
+    def test_disabled(self, mock_get):
+        """Test that not found responses aren't remembered without a TTL."""
+        mock_get.return_value = mock_response(404)
+
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.HTTPError) as context:
+                tmdb.movie(999999999)
+            self.assertNotIsInstance(context.exception, services.CachedNotFoundError)
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("requests.Session.get")
+    def test_invalid_mal_search(self, mock_get):
+        """Test that invalid MAL searches are remembered as empty."""
+        mock_get.return_value = mock_response(400, b'{"message": "invalid q"}')
+
+        self.assertEqual(mal.search("anime", "a"), [])
+        self.assertEqual(mal.search("anime", "a"), [])
+
+        mock_get.assert_called_once()
+        self.assertEqual(
+            caching.get_cache_client().ttl(
+                cache.make_key(caching.get_search_key("search_mal_anime", "a")),
+            ),
+            settings.METADATA_NOT_FOUND_TTL,
+        )
+
+
+class Metrics(TestCase):
+    """Test the provider and metadata cache metrics."""
+
+    def setUp(self):
+        """Clear the metrics and the cache before each test."""
+        metrics.clear()
+        self.addCleanup(metrics.clear)
+        cache.clear()
+        caching.local_cache.clear()
+
+    def test_endpoint(self):
+        """Test that ids and usernames are left out of the endpoints."""
+        self.assertEqual(
+            metrics.get_endpoint("https://api.themoviedb.org/3/tv/1396/season/2"),
+            "/3/tv/{id}/season/{id}",
+        )
+        self.assertEqual(
+            metrics.get_endpoint("https://api.trakt.tv/users/someone/watched/shows"),
+            "/users/{id}/watched/shows",
+        )
+        self.assertEqual(
+            metrics.get_endpoint("https://api.igdb.com/v4/games"),
+            "/v4/games",
+        )
+
+    def test_histogram(self):
+        """Test that histogram buckets are rendered cumulatively."""
+        metrics.observe("provider_request_seconds", 0.2, provider="MAL")
+        metrics.observe("provider_request_seconds", 3, provider="MAL")
+        metrics.observe("provider_request_seconds", 120, provider="MAL")
+
+        lines = metrics.render().splitlines()
+
+        self.assertIn("# TYPE provider_request_seconds histogram", lines)
+        self.assertIn(
+            'provider_request_seconds_bucket{provider="MAL",le="0.1"} 0',
+            lines,
+        )
+        self.assertIn(
+            'provider_request_seconds_bucket{provider="MAL",le="0.25"} 1',
+            lines,
+        )
+        self.assertIn(
+            'provider_request_seconds_bucket{provider="MAL",le="5"} 2',
+            lines,
+        )
+        self.assertIn(
+            'provider_request_seconds_bucket{provider="MAL",le="+Inf"} 3',
+            lines,
+        )
+        self.assertIn('provider_request_seconds_count{provider="MAL"} 3', lines)
+        self.assertIn('provider_request_seconds_sum{provider="MAL"} 123.2', lines)
+
+    @patch("requests.Session.get")
+    def test_provider_requests(self, mock_get):
+        """Test that the latency and status of provider requests are recorded."""
+        mock_get.side_effect = [
+            mock_response(200, b"{}"),
+            mock_response(404),
+        ]
+
+        services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/1")
+        with self.assertRaises(requests.exceptions.HTTPError):
+            services.api_request("TMDB", "GET", "https://api.themoviedb.org/3/movie/2")
+
+        lines = metrics.render().splitlines()
+        self.assertIn(
+            "provider_request_seconds_count"
+            '{endpoint="/3/movie/{id}",provider="TMDB"} 2',
+            lines,
+        )
+        self.assertIn('provider_responses_total{provider="TMDB",status="200"} 1', lines)
+        self.assertIn('provider_responses_total{provider="TMDB",status="404"} 1', lines)
+
+    def test_cache_reads(self):
+        """Test that cache reads are counted by prefix and source."""
+        caching.set_cached("movie_1", {"title": "Cached"})
+        caching.local_cache.clear()
+
+        caching.get_cached("movie_1", tmdb.movie, 1)
+        caching.get_cached("movie_1", tmdb.movie, 1)
+        caching.get_many_cached({"movie_2": (tmdb.movie, (2,))})
+
+        lines = metrics.render().splitlines()
+        for source in ("local", "redis", "miss"):
+            self.assertIn(
+                f'metadata_cache_reads_total{{prefix="movie",source="{source}"}} 1',
+                lines,
+            )
+        self.assertEqual(
+            lines[lines.index("# TYPE metadata_cache_key_reads gauge") + 1],
+            'metadata_cache_key_reads{key="movie_1"} 2',
+        )
+
+    def test_local_hit_skips_redis(self):
+        """Test that local cache hits are counted without Redis commands."""
+        caching.set_cached("movie_1", {"title": "Cached"})
+        caching.subscribe_invalidations()
+
+        with (
+            patch.object(
+                services.redis_pool,
+                "get_connection",
+                side_effect=AssertionError("Redis command sent"),
+            ),
+            patch("app.providers.caching.cache.get") as mock_get,
+        ):
+            caching.get_cached("movie_1", tmdb.movie, 1)
+
+        mock_get.assert_not_called()
+        self.assertIn(
+            'metadata_cache_reads_total{prefix="movie",source="local"} 1',
+            metrics.render().splitlines(),
+        )
+
+
+class Snapshots(TestCase):
+    """Test the copy of the metadata kept in the database."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        self.lose_cache()
+
+    def lose_cache(self):
+        """Clear Redis and the local cache, like a flush or a restart would."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    def test_parse_key(self):
+        """Test that only the media metadata keys are stored."""
+        self.assertEqual(snapshots.parse_key("movie_1"), ("tmdb", "movie", 1, None))
+        self.assertEqual(
+            snapshots.parse_key("season_1396_0"),
+            ("tmdb", "season", 1396, 0),
+        )
+        self.assertEqual(
+            snapshots.parse_key("mangaupdates_manga_2"),
+            ("mangaupdates", "manga", 2, None),
+        )
+        self.assertIsNone(snapshots.parse_key("search_tv_abc"))
+        self.assertIsNone(snapshots.parse_key("anime_1"))
+
+    def test_restore_after_loss(self):
+        """Test that lost metadata is restored without fetching it."""
+        caching.set_cached("movie_1", {"media_id": 1}, {"ETag": '"v1"'})
+        self.lose_cache()
+
+        with patch("app.providers.caching.schedule_refresh") as mock_refresh:
+            data = caching.get_or_fetch("movie_1", fetch_fresh, 1)
+
+        self.assertEqual(data, {"media_id": 1})
+        mock_refresh.assert_not_called()
+        entry = caching.load_entry("movie_1", cache.get("movie_1"))
+        self.assertEqual(entry["validators"], {"ETag": '"v1"'})
+
+    def test_restore_many(self):
+        """Test that the keys lost by Redis are restored in bulk."""
+        caching.set_many_cached({"tv_1": {"media_id": 1}, "tv_2": {"media_id": 2}})
+        self.lose_cache()
+        caching.set_cached("tv_2", {"media_id": 2, "title": "Redis"})
+        MetadataSnapshot.objects.filter(key="tv_2").delete()
+
+        data = caching.get_many_cached(
+            {key: (fetch_fresh, (1,)) for key in ("tv_1", "tv_2", "tv_3")},
+        )
+
+        self.assertEqual(
+            data,
+            {"tv_1": {"media_id": 1}, "tv_2": {"media_id": 2, "title": "Redis"}},
+        )
+        self.assertIsNotNone(cache.get("tv_1"))
+
+    def test_stale_snapshot(self):
+        """Test that expired snapshots are restored and refreshed."""
+        caching.set_cached("game_1", {"media_id": 1})
+        caching.expire_cached("game_1")
+        self.lose_cache()
+
+        with patch("app.providers.caching.schedule_refresh") as mock_refresh:
+            data = caching.get_cached("game_1", fetch_fresh, 1)
+
+        self.assertEqual(data, {"media_id": 1})
+        mock_refresh.assert_called_once_with("game_1", fetch_fresh, 1)
+
+    @patch("app.providers.caching.WAIT_TIMEOUT", 0.3)
+    def test_polling_skips_database(self):
+        """Test that waiting for another fetch only polls Redis."""
+        token = caching.acquire_lock(f"lock:{cache.make_key('movie_3')}")
+        self.addCleanup(
+            caching.release_lock,
+            f"lock:{cache.make_key('movie_3')}",
+            token,
+        )
+
+        with patch("app.providers.snapshots.load_many") as mock_load:
+            data = caching.single_flight("movie_3", fetch_fresh, 3)
+
+        self.assertIsNotNone(data)
+        mock_load.assert_not_called()
+
+    @override_settings(METADATA_SNAPSHOTS=False)
+    def test_disabled(self):
+        """Test that nothing is stored when the snapshots are disabled."""
+        caching.set_cached("movie_2", {"media_id": 2})
+
+        self.assertFalse(MetadataSnapshot.objects.exists())
+
+
+class Warmup(TestCase):
+    """Test the warmup of the metadata of the tracked media."""
+
+    @patch(
+        "app.providers.services.get_media_metadata",
+        return_value={"max_progress": 1},
+    )
+    def setUp(self, _):
+        """Track a movie, an anime and a manual movie."""
+        cache.clear()
+        credentials = {"username": "test", "password": "12345"}
+        user = get_user_model().objects.create_user(**credentials)
+        self.media = {}
+        for media_id, source, model in (
+            (1, "tmdb", Movie),
+            (2, "mal", Anime),
+            (3, "manual", Movie),
+        ):
+            item = Item.objects.create(
+                media_id=media_id,
+                source=source,
+                media_type=model.__name__.lower(),
+                title=f"Title {media_id}",
+                image="http://example.com/image.jpg",
+            )
+            self.media[media_id] = model.objects.create(
+                item=item,
+                user=user,
+                status=STATUS_PLANNING,
+            )
+
+    def test_recent_activity_first(self):
+        """Test that the most recently changed media come first."""
+        self.media[1].notes = "Changed"
+        self.media[1].save()
+
+        self.assertEqual(
+            warmup.get_tracked_media(),
+            [("movie", 1, "tmdb", None), ("anime", 2, "mal", None)],
+        )
+
+    @patch("app.warmup.BATCH_SIZE", 1)
+    @patch("app.providers.services.get_media_metadata_many")
+    def test_resume(self, mock_many):
+        """Test that an interrupted warmup resumes after the last batch."""
+        mock_many.side_effect = [
+            {("anime", 2, "mal", None): {}},
+            {("movie", 1, "tmdb", None): ratelimit.RateLimitedError("TMDB", 60)},
+        ]
+        with self.assertRaises(ratelimit.RateLimitedError):
+            warmup.warm_metadata()
+        self.assertEqual(
+            cache.get(warmup.PROGRESS_KEY),
+            {"done": 1, "failed": 0, "total": 2},
+        )
+
+        mock_many.side_effect = None
+        mock_many.return_value = {
+            ("movie", 1, "tmdb", None): requests.exceptions.HTTPError(),
+        }
+        stdout = StringIO()
+        call_command("warm_metadata", stdout=stdout)
+
+        mock_many.assert_called_with([("movie", 1, "tmdb", None)])
+        self.assertIn("2/2 media, 1 failed", stdout.getvalue())
+        self.assertIsNone(cache.get(warmup.PROGRESS_KEY))
+
+
+class LocalCache(TestCase):
+    """Test the in-process cache in front of Redis."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    def test_hit_skips_redis(self):
+        """Test that repeated lookups are served from the local cache."""
+        caching.set_cached("local_1", {"media_id": 1})
+
+        with patch("app.providers.caching.cache.get") as mock_get:
+            data = caching.get_or_fetch("local_1", fetch_fresh, 1)
+
+        mock_get.assert_not_called()
+        self.assertEqual(data, {"media_id": 1})
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted when full."""
+        local_cache = caching.LocalCache(maxsize=2, ttl=60)
+        local_cache.set("a", 1)
+        local_cache.set("b", 2)
+        local_cache.get("a")
+        local_cache.set("c", 3)
+
+        self.assertEqual(local_cache.get("a"), 1)
+        self.assertIsNone(local_cache.get("b"))
+        self.assertEqual(list(local_cache.entries), ["c", "a"])
+
+    def test_invalidation_from_other_process(self):
+        """Test that keys changed by other processes are dropped locally."""
+        caching.set_cached("local_2", {"media_id": 2})
+        services.get_redis().publish(caching.INVALIDATION_CHANNEL, "other:local_2")
+
+        for _ in range(30):
+            if caching.local_cache.get("local_2") is None:
+                break
+            time.sleep(0.1)
+        self.assertIsNone(caching.local_cache.get("local_2"))
+
+
+class Serializers(TestCase):
+    """Test the serialization of the cached metadata."""
+
+    def setUp(self):
+        """Clear the cache and metrics before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+        metrics.clear()
+        self.addCleanup(metrics.clear)
+
+    def test_compressed_round_trip(self):
+        """Test that metadata is stored compressed and read back unchanged."""
+        metadata = {"media_id": 1, "title": "Compressed", "synopsis": "a" * 1000}
+        caching.set_cached("movie_1", metadata)
+
+        stored = cache.get("movie_1")
+        self.assertTrue(stored.startswith(serializers.JSONZlibSerializer.prefix))
+        self.assertLess(len(stored), 200)
+
+        caching.local_cache.clear()
+        self.assertEqual(caching.get_or_fetch("movie_1", fetch_fresh, 1), metadata)
+        lines = metrics.render().splitlines()
+        self.assertIn("# TYPE metadata_cache_entry_bytes summary", lines)
+        self.assertIn(
+            f'metadata_cache_entry_bytes_sum{{prefix="movie"}} {len(stored)}',
+            lines,
+        )
+        self.assertIn('metadata_cache_entry_bytes_count{prefix="movie"} 1', lines)
+
+    def test_read_other_serializer(self):
+        """Test that entries written by another serializer can still be read."""
+        with override_settings(
+            METADATA_CACHE_SERIALIZER="app.providers.serializers.PickleSerializer",
+        ):
+            caching.set_cached("tv_1", {"media_id": 1})
+        caching.local_cache.clear()
+
+        self.assertEqual(caching.get_or_fetch("tv_1", fetch_fresh, 1), {"media_id": 1})
+
+    def test_unknown_format(self):
+        """Test that values in an unknown format are treated as missing."""
+        cache.set("tv_2", b"unknown")
+
+        self.assertEqual(
+            caching.get_or_fetch("tv_2", fetch_fresh, 2),
+            fetch_fresh(2),
+        )
+
+
+class SeasonEpisodes(TestCase):
+    """Test the trimmed episodes of the cached season metadata."""
+
+    episode = {
+        "episode_number": 1,
+        "name": "Pilot",
+        "air_date": "2008-01-20",
+        "still_path": "/pilot.jpg",
+        "overview": "Walter White starts cooking.",
+        "runtime": 58,
+        "crew": [{"name": "Vince Gilligan"}],
+        "guest_stars": [{"name": "Guest"}],
+        "vote_average": 8.2,
+    }
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    def test_process_season(self):
+        """Test that only the used episode fields are kept."""
+        response = {
+            "name": "Season 1",
+            "poster_path": "/season.jpg",
+            "season_number": 1,
+            "overview": "",
+            "air_date": "2008-01-20",
+            "episodes": [self.episode],
+        }
+
+        episodes = tmdb.process_season(response)["episodes"]
+
+        self.assertEqual(list(episodes[0]), list(tmdb.EPISODE_FIELDS))
+        self.assertEqual(episodes[0]["runtime"], 58)
+
+    def test_trim_cached_seasons(self):
+        """Test that seasons cached with every episode field are trimmed."""
+        cache.set("season_1396_1", {"title": "Season 1", "episodes": [self.episode]})
+        caching.set_cached("season_1396_2", {"episodes": [self.episode]})
+        caching.local_cache.clear()
+        stdout = StringIO()
+
+        call_command("trim_cached_seasons", stdout=stdout)
+
+        for key in ("season_1396_1", "season_1396_2"):
+            episode = caching.load_entry(key, cache.get(key))["data"]["episodes"][0]
+            self.assertEqual(list(episode), list(tmdb.EPISODE_FIELDS))
+        self.assertIn("2 cached seasons", stdout.getvalue())
+
+
+class TVWithSeasons(TestCase):
+    """Test fetching a tv show with its seasons."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    def mock_tv_response(self, *_args, params):
+        """Return the TMDB response of a show with the appended responses."""
+        response = {
+            "id": 1,
+            "name": "Show",
+            "poster_path": "/show.jpg",
+            "overview": "",
+            "first_air_date": "2008-01-20",
+            "last_air_date": "2013-09-29",
+            "status": "Ended",
+            "number_of_seasons": 25,
+            "number_of_episodes": 25,
+            "episode_run_time": [],
+            "genres": [],
+            "production_companies": [],
+            "production_countries": [],
+            "spoken_languages": [],
+            "seasons": [],
+        }
+        for append in params["append_to_response"].split(","):
+            if append == "recommendations":
+                response[append] = {"results": []}
+            else:
+                response[append] = {
+                    "name": append,
+                    "poster_path": None,
+                    "season_number": int(append.removeprefix("season/")),
+                    "overview": "",
+                    "air_date": "2008-01-20",
+                    "episodes": [],
+                }
+        return response
+
+    @patch("app.providers.services.async_api_request", new_callable=AsyncMock)
+    def test_uncached(self, mock_request):
+        """Test that the show is fetched with the first chunk of seasons."""
+        mock_request.side_effect = self.mock_tv_response
+
+        data = tmdb.tv_with_seasons(1, list(range(1, 26)))
+
+        self.assertEqual(mock_request.call_count, 2)
+        first, second = (
+            call.kwargs["params"]["append_to_response"].split(",")
+            for call in mock_request.call_args_list
+        )
+        self.assertEqual(first[0], "recommendations")
+        self.assertEqual(len(first), tmdb.MAX_APPENDED)
+        self.assertEqual(second, [f"season/{number}" for number in range(20, 26)])
+        self.assertEqual(data["title"], "Show")
+        self.assertEqual(data["season/25"]["tv_title"], "Show")
+
+        mock_request.reset_mock()
+        self.assertEqual(tmdb.tv(1)["title"], "Show")
+        self.assertEqual(tmdb.season(1, 25)["season_number"], 25)
+        mock_request.assert_not_called()
+
+    @patch("app.providers.services.async_api_request", new_callable=AsyncMock)
+    def test_cached_tv(self, mock_request):
+        """Test that only the uncached seasons are requested."""
+        mock_request.side_effect = self.mock_tv_response
+        caching.set_cached("tv_1", {"title": "Cached"})
+        caching.set_cached("season_1_1", {"title": "Season 1"})
+
+        data = tmdb.tv_with_seasons(1, [1, 2])
+
+        mock_request.assert_called_once()
+        self.assertEqual(
+            mock_request.call_args.kwargs["params"]["append_to_response"],
+            "season/2",
+        )
+        self.assertEqual(data["season/1"]["title"], "Season 1")
+        self.assertEqual(data["season/2"]["tv_title"], "Cached")
+
+    @patch("app.providers.services.async_api_request", new_callable=AsyncMock)
+    def test_cached(self, mock_request):
+        """Test that nothing is requested when the show and seasons are cached."""
+        caching.set_cached("tv_1", {"title": "Cached"})
+        caching.set_cached("season_1_1", {"title": "Season 1"})
+
+        data = tmdb.tv_with_seasons(1, [1])
+
+        mock_request.assert_not_called()
+        self.assertEqual(data["season/1"]["title"], "Season 1")
+
+
+class MetadataMany(TestCase):
+    """Test fetching the metadata of many media at once."""
+
+    def setUp(self):
+        """Clear the cache before each test."""
+        cache.clear()
+        caching.local_cache.clear()
+
+    @patch("app.providers.igdb.fetch_game")
+    @patch("app.providers.tmdb.fetch_movie")
+    def test_cached_and_missing(self, mock_movie, mock_game):
+        """Test that only the missing metadata is fetched and cached."""
+        caching.set_cached("movie_1", {"media_id": 1, "title": "Cached"})
+        caching.local_cache.clear()
+        mock_movie.return_value = {"media_id": 2, "title": "Fetched"}
+
+        not_found = requests.Response()
+        not_found.status_code = 404
+        mock_game.side_effect = requests.exceptions.HTTPError(response=not_found)
+
+        with patch(
+            "app.providers.caching.cache.get_many",
+            wraps=cache.get_many,
+        ) as mock_get_many:
+            results = services.get_media_metadata_many(
+                [
+                    ("movie", 1, "tmdb", None),
+                    ("movie", 2, "tmdb", None),
+                    ("game", 3, "igdb", None),
+                ],
+            )
+
+        mock_get_many.assert_called_once()
+        mock_movie.assert_called_once_with(2)
+        self.assertEqual(results[("movie", 1, "tmdb", None)]["title"], "Cached")
+        self.assertEqual(results[("movie", 2, "tmdb", None)]["title"], "Fetched")
+        self.assertIsInstance(
+            results[("game", 3, "igdb", None)],
+            requests.exceptions.HTTPError,
+        )
+        self.assertEqual(tmdb.movie(2)["title"], "Fetched")
+
+    @override_settings(METADATA_FETCH_CONCURRENCY=1)
+    @patch("app.providers.tmdb.fetch_movie")
+    def test_rate_limited_fetch(self, mock_movie):
+        """Test that a rate limited fetch doesn't lose the others of the batch."""
+        mock_movie.side_effect = [
+            ratelimit.RateLimitedError("api.themoviedb.org", 60),
+            {"media_id": 2, "title": "Fetched"},
+        ]
+
+        results = services.get_media_metadata_many(
+            [("movie", 1, "tmdb", None), ("movie", 2, "tmdb", None)],
+        )
+
+        self.assertIsInstance(
+            results[("movie", 1, "tmdb", None)],
+            ratelimit.RateLimitedError,
+        )
+        self.assertEqual(results[("movie", 2, "tmdb", None)]["title"], "Fetched")
+        self.assertEqual(tmdb.movie(2)["title"], "Fetched")
+        self.assertEqual(mock_movie.call_count, 2)
+
+    @patch("app.providers.igdb.get_access_token", return_value="token")
+    @patch("app.providers.services.api_request")
+    def test_batched_games(self, mock_request, _):
+        """Test that games are fetched with a single multiquery request."""
+        mock_request.side_effect = [
+            [
+                {
+                    "name": "0",
+                    "result": [
+                        {
+                            "id": media_id,
+                            "name": f"Game {media_id}",
+                            "summary": "",
+                            "category": 0,
+                        }
+                        for media_id in (1, 2)
+                    ],
+                },
+            ],
+            [],
+        ]
+
+        results = services.get_media_metadata_many(
+            [("game", media_id, "igdb", None) for media_id in ("1", "2", "3")],
+        )
+
+        self.assertEqual(mock_request.call_count, 2)
+        multiquery, single = mock_request.call_args_list
+        self.assertEqual(multiquery.args[2], "https://api.igdb.com/v4/multiquery")
+        self.assertIn("where id = (1,2,3);", multiquery.kwargs["data"])
+        # the game missing from the batch is only not found once asked alone
+        self.assertEqual(single.args[2], "https://api.igdb.com/v4/games")
+        self.assertIn("where id = 3;", single.kwargs["data"])
+        self.assertEqual(results[("game", "2", "igdb", None)]["title"], "Game 2")
+        self.assertEqual(
+            results[("game", "3", "igdb", None)].response.status_code,
+            404,
+        )
+        self.assertEqual(igdb.game(1)["title"], "Game 1")
+
+    @patch("app.providers.igdb.QUERY_LIMIT", 2)
+    @patch("app.providers.igdb.MULTIQUERY_SIZE", 2)
+    @patch("app.providers.igdb.get_access_token", return_value="token")
+    @patch("app.providers.services.api_request", return_value=[])
+    def test_multiquery_size(self, mock_request, _):
+        """Test that each request holds up to MULTIQUERY_SIZE queries."""
+        igdb.fetch_games(range(1, 6))
+
+        self.assertEqual(mock_request.call_count, 2)
+        first, second = (call.kwargs["data"] for call in mock_request.call_args_list)
+        self.assertEqual(first.count("query games"), 2)
+        self.assertIn("where id = (5);", second)
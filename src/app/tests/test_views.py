@@ -1,10 +1,20 @@
 import datetime
+import os
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from app import database, images, tasks
 from app.models import TV, Anime, Episode, Item, Movie, Season
+from app.providers import caching, circuitbreaker, metrics, ratelimit, services
+from app.templatetags import app_extras
 
 
 class CreateMedia(TestCase):
@@ -373,3 +383,396 @@ class ProgressEditAnime(TestCase):
         )
 
         self.assertEqual(Anime.objects.get(item__media_id=1).progress, 1)
+
+
+class RateLimited(TestCase):
+    """Test the views when a provider is rate limited."""
+
+    def setUp(self):
+        """Create a user, log in and rate limit TMDB."""
+        self.credentials = {"username": "test", "password": "12345"}
+        self.user = get_user_model().objects.create_user(**self.credentials)
+        self.client.login(**self.credentials)
+
+        cache.clear()
+        caching.local_cache.clear()
+        ratelimit.pause_host("api.themoviedb.org", 60)
+        self.addCleanup(services.get_redis().flushall)
+
+    def test_try_again_page(self):
+        """Test that the view fails fast with a try again page."""
+        response = self.client.get(
+            reverse("media_details", args=["movie", 1, "test"]) + "?source=tmdb",
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertTemplateUsed(response, "provider_error.html")
+        self.assertIn(int(response["Retry-After"]), range(55, 61))
+
+    def test_try_again_fragment(self):
+        """Test that htmx requests get a try again fragment."""
+        response = self.client.get(
+            reverse("media_details", args=["movie", 1, "test"]) + "?source=tmdb",
+            headers={"HX-Request": "true"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "app/components/provider_error.html")
+
+
+class DeadlineExceeded(TestCase):
+    """Test the views when the provider requests take too long."""
+
+    def setUp(self):
+        """Create a user and log in."""
+        self.credentials = {"username": "test", "password": "12345"}
+        self.user = get_user_model().objects.create_user(**self.credentials)
+        self.client.login(**self.credentials)
+
+        cache.clear()
+        caching.local_cache.clear()
+
+    @override_settings(VIEW_DEADLINE=0)
+    def test_try_again_page(self):
+        """Test that the view stops requesting once its deadline is spent."""
+        response = self.client.get(
+            reverse("media_details", args=["movie", 1, "test"]) + "?source=tmdb",
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertContains(response, "taking too long", status_code=503)
+        self.assertNotIn("Retry-After", response)
+
+
+class Search(TestCase):
+    """Test the search of a media type, starting with the known items."""
+
+    def setUp(self):
+        """Create a user, log in and add known items."""
+        self.credentials = {"username": "test", "password": "12345"}
+        self.user = get_user_model().objects.create_user(**self.credentials)
+        self.client.login(**self.credentials)
+
+        self.item = Item.objects.create(
+            media_id=1,
+            source="tmdb",
+            media_type="movie",
+            title="The Known Movie",
+            image="http://example.com/image.jpg",
+        )
+        Item.objects.create(
+            media_id=2,
+            source="tmdb",
+            media_type="tv",
+            title="The Known Show",
+            image="http://example.com/image.jpg",
+        )
+
+    @patch("app.providers.tmdb.search")
+    def test_known_items(self, mock_search):
+        """Test that the known items are shown without searching the provider."""
+        response = self.client.get(reverse("search") + "?media_type=movie&q=kno")
+
+        self.assertContains(response, "The Known Movie")
+        self.assertNotContains(response, "The Known Show")
+        mock_search.assert_not_called()
+
+    @patch("app.providers.tmdb.search")
+    def test_provider_results(self, mock_search):
+        """Test that the provider results exclude the known items."""
+        mock_search.return_value = [
+            {
+                "media_id": media_id,
+                "source": "tmdb",
+                "media_type": "movie",
+                "title": title,
+                "image": "http://example.com/image.jpg",
+            }
+            for media_id, title in [(1, "The Known Movie"), (3, "Another Movie")]
+        ]
+
+        response = self.client.get(
+            reverse("search") + "?media_type=movie&q=movie",
+            headers={"HX-Request": "true"},
+        )
+
+        self.assertContains(response, "Another Movie")
+        self.assertNotContains(response, "The Known Movie")
+        self.assertNotContains(response, "No results found")
+
+    def test_renamed_item(self):
+        """Test that the title index follows the renamed items."""
+        self.item.title = "Renamed Película"
+        self.item.save()
+
+        self.assertEqual(database.search_items("movie", "known"), [])
+        self.assertEqual(database.search_items("movie", "pelicula"), [self.item])
+
+
+class SearchAll(TestCase):
+    """Test the search of every media type at once."""
+
+    def setUp(self):
+        """Create a user and log in."""
+        self.credentials = {"username": "test", "password": "12345"}
+        self.user = get_user_model().objects.create_user(**self.credentials)
+        self.client.login(**self.credentials)
+
+    @patch("app.providers.services.search_all")
+    def test_search_all(self, mock_search_all):
+        """Test that the results are shown by type with the failed searches."""
+        mock_search_all.return_value = (
+            {
+                "Movie": [
+                    {
+                        "media_id": 1,
+                        "source": "tmdb",
+                        "media_type": "movie",
+                        "title": "Found Movie",
+                        "image": "http://example.com/image.jpg",
+                    },
+                ],
+                "Game": [],
+            },
+            ["Anime"],
+        )
+
+        response = self.client.get(reverse("search") + "?media_type=all&q=found")
+
+        self.assertContains(response, "Found Movie")
+        self.assertContains(response, "Couldn't search Anime")
+        self.assertNotContains(response, ">Game</h1>")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_search_type, "all")
+
+
+class ProviderUnavailable(TestCase):
+    """Test the views when a provider is down."""
+
+    def setUp(self):
+        """Create a user, log in and open the circuit of TMDB."""
+        self.credentials = {"username": "test", "password": "12345"}
+        self.user = get_user_model().objects.create_user(**self.credentials)
+        self.client.login(**self.credentials)
+
+        cache.clear()
+        caching.local_cache.clear()
+        circuitbreaker.open_circuit("TMDB")
+        self.addCleanup(services.get_redis().flushall)
+
+    def test_saved_item(self):
+        """Test that the page is rendered from the saved item with a notice."""
+        Item.objects.create(
+            media_id=1,
+            source="tmdb",
+            media_type="movie",
+            title="Saved Movie",
+            image="http://example.com/image.jpg",
+        )
+
+        response = self.client.get(
+            reverse("media_details", args=["movie", 1, "test"]) + "?source=tmdb",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Saved Movie")
+        self.assertContains(response, "Metadata unavailable")
+
+    def test_saved_item_without_source(self):
+        """Test that links without a source fall back to the saved TMDB item."""
+        Item.objects.create(
+            media_id=1,
+            source="tmdb",
+            media_type="tv",
+            title="Saved Show",
+            image="http://example.com/image.jpg",
+        )
+
+        response = self.client.get(reverse("media_details", args=["tv", 1, "test"]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Saved Show")
+        self.assertContains(response, "Metadata unavailable")
+
+    def test_saved_season(self):
+        """Test that the season page is rendered from the saved items."""
+        for media_type, season_number in (("tv", None), ("season", 1)):
+            Item.objects.create(
+                media_id=1,
+                source="tmdb",
+                media_type=media_type,
+                title="Saved Show",
+                image="http://example.com/image.jpg",
+                season_number=season_number,
+            )
+
+        response = self.client.get(reverse("season_details", args=[1, "test", 1]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Saved Show")
+        self.assertContains(response, "Metadata unavailable")
+
+    def test_unsaved_item(self):
+        """Test that a try again page is shown when nothing is saved."""
+        response = self.client.get(
+            reverse("media_details", args=["movie", 2, "test"]) + "?source=tmdb",
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertTemplateUsed(response, "provider_error.html")
+
+
+class ImageProxy(TestCase):
+    """Test the resized provider images."""
+
+    url = "https://image.tmdb.org/t/p/w500/poster.png"
+
+    def setUp(self):
+        """Create a user, log in and use a temporary image cache."""
+        cache.clear()
+        self.credentials = {"username": "test", "password": "12345"}
+        self.user = get_user_model().objects.create_user(**self.credentials)
+        self.client.login(**self.credentials)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(IMAGE_CACHE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get_image(self, url=None, variant="poster"):
+        """Request the variant of the image."""
+        return self.client.get(
+            reverse("image", args=[variant]),
+            {"url": url or self.url},
+        )
+
+    def mock_download(self, mock_get, content):
+        """Make the download of the original image return the content."""
+        mock_get.return_value.iter_content.return_value = [content]
+
+    def get_png(self, size):
+        """Return a PNG image of the size."""
+        png = BytesIO()
+        Image.new("P", size).save(png, "PNG")
+        return png.getvalue()
+
+    @patch("requests.get")
+    def test_resized_webp(self, mock_get):
+        """Test that the image is resized to WebP in a task and served from disk."""
+        self.mock_download(mock_get, self.get_png((1000, 1500)))
+
+        first = self.get_image()
+        response = self.get_image()
+
+        self.assertRedirects(first, self.url, fetch_redirect_response=False)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("immutable", response["Cache-Control"])
+        with Image.open(BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (300, 450)))
+        mock_get.assert_called_once()
+
+    @patch("app.tasks.resize_image.delay")
+    def test_resize_queued_once(self, mock_delay):
+        """Test that repeated misses queue a single resize."""
+        self.get_image()
+        response = self.get_image()
+
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        mock_delay.assert_called_once_with(self.url, "poster")
+
+    @patch("requests.get")
+    def test_unreadable_image(self, mock_get):
+        """Test that images that can't be resized redirect to the original."""
+        self.mock_download(mock_get, b"not an image")
+
+        response = self.get_image()
+
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertFalse(images.get_path(self.url, "poster").exists())
+
+    @patch("requests.get")
+    def test_decompression_bomb(self, mock_get):
+        """Test that images too large to decode aren't resized."""
+        self.mock_download(mock_get, self.get_png((1000, 1000)))
+
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            result = tasks.resize_image(self.url, "poster")
+
+        self.assertEqual(result, f"Failed to resize {self.url}")
+        self.assertFalse(images.get_path(self.url, "poster").exists())
+
+    @patch("app.images.MAX_DOWNLOAD_SIZE", 100)
+    @patch("requests.get")
+    def test_large_download(self, mock_get):
+        """Test that the download stops once over the size limit."""
+        mock_get.return_value.iter_content.return_value = [b"0" * 80] * 3
+
+        with self.assertRaises(ValueError):
+            images.download(self.url)
+
+        mock_get.return_value.close.assert_called_once()
+
+    @override_settings(IMAGE_CACHE_SIZE=1)
+    def test_clean_cache(self):
+        """Test that the oldest images are deleted once over the size limit."""
+        paths = [images.get_path(f"{self.url}?{i}", "poster") for i in range(3)]
+        for i, path in enumerate(paths):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"0" * 512 * 1024)
+            os.utime(path, (i, i))
+
+        deleted = images.clean_cache()
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual([path.exists() for path in paths], [False, True, True])
+
+    def test_other_hosts(self):
+        """Test that only the provider images and variants are served."""
+        self.assertEqual(self.get_image("https://example.com/a.png").status_code, 404)
+        self.assertEqual(self.get_image(variant="original").status_code, 404)
+
+    def test_proxy_filter(self):
+        """Test that only the provider image URLs are proxied."""
+        self.assertEqual(
+            app_extras.proxy_image(self.url, "still"),
+            "/image/still?url=https%3A%2F%2Fimage.tmdb.org%2Ft%2Fp%2Fw500%2Fposter.png",
+        )
+        self.assertEqual(
+            app_extras.proxy_image(settings.IMG_NONE, "poster"),
+            settings.IMG_NONE,
+        )
+
+
+class ProviderMetrics(TestCase):
+    """Test the metrics endpoint."""
+
+    def setUp(self):
+        """Create a user, log in and record a response."""
+        self.credentials = {"username": "test", "password": "12345"}
+        self.user = get_user_model().objects.create_user(**self.credentials)
+        self.client.login(**self.credentials)
+
+        metrics.clear()
+        self.addCleanup(metrics.clear)
+        metrics.increment("provider_responses_total", provider="TMDB", status=200)
+
+    def test_staff(self):
+        """Test that staff users get the metrics in the Prometheus format."""
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertContains(
+            response,
+            'provider_responses_total{provider="TMDB",status="200"} 1',
+        )
+
+    def test_not_staff(self):
+        """Test that other users can't see the metrics."""
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 403)
@@ -27,4 +27,6 @@ urlpatterns = [
     path("add/media", views.add_manual_media, name="add_manual_media"),
     path("history_modal", views.history, name="history"),
     path("history_delete", views.history_delete, name="history_delete"),
+    path("metrics", views.provider_metrics, name="metrics"),
+    path("image/<str:variant>", views.image, name="image"),
 ]
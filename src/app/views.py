@@ -2,15 +2,26 @@ import logging
 
 from django.apps import apps
 from django.contrib import messages
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_GET, require_http_methods, require_POST
 
-from app import database, helpers
+from app import database, helpers, images
 from app.forms import FilterForm, ManualItemForm, get_form_class
 from app.models import STATUS_IN_PROGRESS, Episode, Item, Season
-from app.providers import igdb, mal, mangaupdates, services, tmdb
+from app.providers import (
+    circuitbreaker,
+    igdb,
+    mal,
+    mangaupdates,
+    metrics,
+    services,
+    tmdb,
+)
+from app.tasks import resize_image
 
 logger = logging.getLogger(__name__)
 
@@ -96,9 +107,33 @@ def media_search(request):
     query = request.GET["q"]
     request.user.set_last_search_type(media_type)
 
+    if media_type == "all":
+        results_by_type, failed = services.search_all(query)
+        context = {
+            "results_by_type": {
+                label: results for label, results in results_by_type.items() if results
+            },
+            "failed": failed,
+        }
+        return render(request, "app/search_all.html", context)
+
     # only receives source when searching with secondary source
     source = request.GET.get("source")
 
+    # the known items are shown right away and the page requests the
+    # provider results with htmx
+    if request.headers.get("HX-Request"):
+        return search_results(request, media_type, query, source)
+
+    context = {
+        "item_list": database.search_items(media_type, query, source),
+        "source": source,
+    }
+    return render(request, "app/search.html", context)
+
+
+def search_results(request, media_type, query, source):
+    """Return the provider search results missing from the known items."""
     if media_type == "manga":
         if source == "mangaupdates":
             query_list = mangaupdates.search(query)
@@ -111,16 +146,30 @@ def media_search(request):
     elif media_type == "game":
         query_list = igdb.search(query)
 
-    context = {"query_list": query_list, "source": source}
-
-    return render(request, "app/search.html", context)
+    known_ids = {
+        str(item.media_id)
+        for item in database.search_items(media_type, query, source)
+    }
+    context = {
+        "query_list": [
+            media for media in query_list if str(media["media_id"]) not in known_ids
+        ],
+        "has_known": bool(known_ids),
+    }
+    return render(request, "app/components/search_results.html", context)
 
 
 @require_GET
 def media_details(request, media_type, media_id, title):  # noqa: ARG001 title for URL
     """Return the details page for a media item."""
     source = request.GET.get("source")
-    media_metadata = services.get_media_metadata(media_type, media_id, source)
+    try:
+        media_metadata = services.get_media_metadata(media_type, media_id, source)
+    except circuitbreaker.ProviderUnavailableError as error:
+        media_metadata = services.get_item_metadata(media_type, media_id, source)
+        if media_metadata is None:
+            raise
+        messages.warning(request, get_unavailable_message(error))
 
     context = {"media": media_metadata}
     return render(request, "app/media_details.html", context)
@@ -129,7 +178,24 @@ def media_details(request, media_type, media_id, title):  # noqa: ARG001 title f
 @require_GET
 def season_details(request, media_id, title, season_number):  # noqa: ARG001 title for URL
     """Return the details page for a season."""
-    tv_metadata = tmdb.tv_with_seasons(media_id, [season_number])
+    try:
+        tv_metadata = tmdb.tv_with_seasons(media_id, [season_number])
+    except circuitbreaker.ProviderUnavailableError as error:
+        season_metadata = services.get_item_metadata(
+            "season",
+            media_id,
+            "tmdb",
+            season_number,
+        )
+        if season_metadata is None:
+            raise
+        messages.warning(request, get_unavailable_message(error))
+
+        tv_metadata = services.get_item_metadata("tv", media_id, "tmdb")
+        season_metadata["episodes"] = []
+        context = {"season": season_metadata, "tv": tv_metadata or season_metadata}
+        return render(request, "app/season_details.html", context)
+
     season_metadata = tv_metadata[f"season/{season_number}"]
 
     episodes_in_db = Episode.objects.filter(
@@ -138,15 +204,24 @@ def season_details(request, media_id, title, season_number):  # noqa: ARG001 tit
         related_season__user=request.user,
     ).values("item__episode_number", "watch_date", "repeats")
 
-    season_metadata["episodes"] = tmdb.process_episodes(
-        season_metadata,
-        episodes_in_db,
-    )
+    # copy the shared cached metadata before replacing the episodes
+    season_metadata = {
+        **season_metadata,
+        "episodes": tmdb.process_episodes(season_metadata, episodes_in_db),
+    }
 
     context = {"season": season_metadata, "tv": tv_metadata}
     return render(request, "app/season_details.html", context)
 
 
+def get_unavailable_message(error):
+    """Return the notice shown when a page is rendered from the saved item."""
+    return (
+        f"Metadata unavailable, {error.provider} isn't responding. "
+        "Showing the saved title and image."
+    )
+
+
 @require_GET
 def track(request):
     """Return the tracking form for a media item."""
@@ -419,3 +494,39 @@ def history_delete(request):
         logger.warning("User does not have permission to delete this history record.")
 
     return helpers.redirect_back(request)
+
+
+@require_GET
+def provider_metrics(request):
+    """Return the provider and metadata cache metrics for Prometheus."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+    return HttpResponse(
+        metrics.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@require_GET
+def image(request, variant):
+    """Return a provider image resized to WebP, cached on disk.
+
+    Images that aren't resized yet redirect to the original while a task
+    resizes them, so the page isn't blocked by the downloads.
+    """
+    url = request.GET.get("url", "")
+    if variant not in images.VARIANTS or not images.is_proxied(url):
+        raise Http404
+
+    path = images.get_path(url, variant)
+    if not path.exists():
+        # queued once a minute at most, e.g when a grid is loaded twice
+        if cache.add(f"resize_image:{variant}:{path.stem}", 1, 60):
+            resize_image.delay(url, variant)
+        return redirect(url)
+
+    response = FileResponse(path.open("rb"), content_type="image/webp")
+    # the variant of a URL never changes, provider images get new URLs
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
@@ -0,0 +1,95 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from app.models import TV, Anime, Game, Manga, Movie, Season
+from app.providers import circuitbreaker, ratelimit, services
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY = "warm_metadata_progress"
+BATCH_SIZE = 50  # media requested together, progress is saved after each batch
+
+
+def get_tracked_media():
+    """Return the media tracked by any user, most recently active first.
+
+    Media are (media_type, media_id, source, season_number) tuples, the
+    activity is the last change in the history of any user's entry.
+    """
+    last_activity = {}
+
+    for model in (TV, Season, Anime, Manga, Movie, Game):
+        last_change = (
+            model.history.model.objects.filter(id=OuterRef("id"))
+            .order_by("-history_date")
+            .values("history_date")[:1]
+        )
+        rows = (
+            model.objects.exclude(item__source="manual")
+            .annotate(last_change=Subquery(last_change))
+            .values_list(
+                "item__media_type",
+                "item__media_id",
+                "item__source",
+                "item__season_number",
+                "last_change",
+            )
+        )
+        for *media, changed in rows:
+            previous = last_activity.get(tuple(media))
+            if previous is None or (changed and changed > previous):
+                last_activity[tuple(media)] = changed
+
+    # media without history, e.g imported before it was added, go last
+    return sorted(
+        last_activity,
+        key=lambda media: (last_activity[media] is not None, last_activity[media]),
+        reverse=True,
+    )
+
+
+def warm_metadata(*, restart=False, on_progress=None):
+    """Cache the metadata of every tracked media, resuming the last run.
+
+    The metadata is requested in batches with services.get_media_metadata_many,
+    so cached entries are skipped and the rest is fetched concurrently within
+    METADATA_FETCH_CONCURRENCY and the provider rate limits. on_progress is
+    called with the progress after each batch.
+    """
+    media_list = get_tracked_media()
+    progress = None if restart else cache.get(PROGRESS_KEY)
+    # the saved position is only valid for the same list of media
+    if progress is None or progress["total"] != len(media_list):
+        progress = {"done": 0, "failed": 0, "total": len(media_list)}
+    elif progress["done"]:
+        logger.info("Resuming the metadata warmup at %s", progress["done"])
+
+    while progress["done"] < progress["total"]:
+        batch = media_list[progress["done"] : progress["done"] + BATCH_SIZE]
+        results = services.get_media_metadata_many(batch)
+        # the batch is retried later by the task, its fetched metadata is cached
+        for metadata in results.values():
+            if isinstance(
+                metadata,
+                ratelimit.RateLimitedError | circuitbreaker.ProviderUnavailableError,
+            ):
+                raise metadata
+
+        progress["done"] += len(batch)
+        progress["failed"] += sum(
+            isinstance(metadata, Exception) for metadata in results.values()
+        )
+        cache.set(PROGRESS_KEY, progress, settings.METADATA_HARD_TTL)
+        if on_progress:
+            on_progress(progress)
+
+    cache.delete(PROGRESS_KEY)
+    logger.info(
+        "Warmed the metadata of %s media, %s failed",
+        progress["total"],
+        progress["failed"],
+    )
+    return progress
@@ -1,10 +1,37 @@
 import os
 
-from celery import Celery
+from celery import Celery, Task
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
+
+class ProviderTask(Task):
+    """Task retried later when a provider is rate limited or down.
+
+    Set as the base of the tasks that call the providers, max_retries only
+    limits these retries, other errors fail the task as usual.
+    """
+
+    max_retries = 5
+
+    def __call__(self, *args, **kwargs):
+        """Run the task without waiting on long rate limit pauses."""
+        # imported here as the apps aren't loaded when this module is
+        from app.providers import circuitbreaker, ratelimit
+
+        token = ratelimit.wait_on_rate_limit.set(False)
+        try:
+            return super().__call__(*args, **kwargs)
+        except (
+            ratelimit.RateLimitedError,
+            circuitbreaker.ProviderUnavailableError,
+        ) as error:
+            raise self.retry(exc=error, countdown=error.retry_after) from error
+        finally:
+            ratelimit.wait_on_rate_limit.reset(token)
+
+
 app = Celery("yamtrack")
 
 app.config_from_object("django.conf:settings", namespace="CELERY")
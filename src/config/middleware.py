@@ -1,7 +1,13 @@
+import time
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
 from django.urls import resolve
 from django.utils.deprecation import MiddlewareMixin
 
+from app.providers import circuitbreaker, ratelimit, services
+
 LOGIN_EXEMPT_ROUTES = ("login", "register")
 
 class LoginRequiredMiddleware(MiddlewareMixin):
@@ -22,3 +28,57 @@ class LoginRequiredMiddleware(MiddlewareMixin):
             return None
 
         return login_required(view_func)(request, *view_args, **view_kwargs)
+
+
+class ProviderRequestMiddleware:
+    """Middleware that bounds the time views spend on provider requests.
+
+    Views fail fast when a provider asks to wait longer than
+    RATE_LIMIT_MAX_WAIT, its circuit is open or the VIEW_DEADLINE is spent,
+    and a try again message is shown instead.
+    """
+
+    def __init__(self, get_response):
+        """Store the next middleware or view."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Process the request within the deadline, without long rate limit pauses."""
+        wait_token = ratelimit.wait_on_rate_limit.set(False)
+        deadline_token = services.request_deadline.set(
+            time.monotonic() + settings.VIEW_DEADLINE,
+        )
+        try:
+            return self.get_response(request)
+        finally:
+            services.request_deadline.reset(deadline_token)
+            ratelimit.wait_on_rate_limit.reset(wait_token)
+
+    def process_exception(self, request, exception):
+        """Render the try again message for provider errors."""
+        if isinstance(exception, ratelimit.RateLimitedError):
+            message = "The media provider is limiting requests"
+        elif isinstance(exception, circuitbreaker.ProviderUnavailableError):
+            message = f"{exception.provider} isn't responding"
+        elif isinstance(exception, services.DeadlineExceededError):
+            message = "The media provider is taking too long"
+        else:
+            return None
+
+        # htmx doesn't swap error responses, send the fragment as a success
+        if request.headers.get("HX-Request"):
+            template = "app/components/provider_error.html"
+            status = 200
+        else:
+            template = "provider_error.html"
+            status = 503
+
+        response = render(
+            request,
+            template,
+            {"message": message, "retry_after": round(exception.retry_after)},
+            status=status,
+        )
+        if exception.retry_after:
+            response["Retry-After"] = str(round(exception.retry_after))
+        return response
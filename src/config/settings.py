@@ -64,6 +64,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "config.middleware.LoginRequiredMiddleware",
+    "config.middleware.ProviderRequestMiddleware",
     "simple_history.middleware.HistoryRequestMiddleware",
 ]
 
@@ -217,9 +218,79 @@ IMG_NONE = "https://www.themoviedb.org/assets/2/v4/glyphicons/basic/glyphicons-b
 
 REQUEST_TIMEOUT = 120  # seconds
 
+# serve the provider images resized to WebP from a disk cache
+IMAGE_PROXY = config("IMAGE_PROXY", default=True, cast=bool)
+IMAGE_CACHE_DIR = config("IMAGE_CACHE_DIR", default=str(BASE_DIR / "db" / "images"))
+# megabytes of resized images kept, the oldest are deleted every day past it
+IMAGE_CACHE_SIZE = config("IMAGE_CACHE_SIZE", default=1024, cast=int)
+# (connect, read) timeouts in seconds of the provider requests, pages use the
+# interactive ones and background tasks the background ones
+PROVIDER_TIMEOUTS = {
+    "default": {"interactive": (3.05, 15), "background": (10, REQUEST_TIMEOUT)},
+    "MANGAUPDATES": {"interactive": (3.05, 20), "background": (10, REQUEST_TIMEOUT)},
+}
+# seconds a page can spend on provider requests, the remaining ones are skipped
+VIEW_DEADLINE = config("VIEW_DEADLINE", default=25, cast=int)
+
+# seconds the all types search waits for the providers, slower ones are skipped
+SEARCH_DEADLINE = config("SEARCH_DEADLINE", default=10, cast=int)
+
+# provider and metadata cache metrics kept in Redis, shown to staff on /metrics
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+
+# stand-in server receiving the provider requests instead of the real APIs,
+# see the provider_standin management command
+PROVIDER_BASE_URL = config("PROVIDER_BASE_URL", default="")
+
+# requests per second shared by all the providers
+API_RATE_LIMIT = config("API_RATE_LIMIT", default=5, cast=int)
+# requests every interval seconds by provider API, adjusted at runtime to the
+# limits reported in the rate limit headers of their responses
+PROVIDER_RATE_LIMITS = {
+    "https://api.myanimelist.net/v2": {"limit": 30, "interval": 60},
+    "https://graphql.anilist.co": {"limit": 85, "interval": 60},
+    "https://api.igdb.com/v4": {"limit": 3, "interval": 1},
+}
+# longest rate limit pause in seconds waited by views and tasks, longer pauses
+# show a try again message or retry the task later
+RATE_LIMIT_MAX_WAIT = config("RATE_LIMIT_MAX_WAIT", default=3, cast=int)
+
+# a provider failing this many times within the window seconds is skipped
+# for the timeout seconds, pages are rendered from the saved items meanwhile
+CIRCUIT_BREAKER_THRESHOLD = config("CIRCUIT_BREAKER_THRESHOLD", default=5, cast=int)
+CIRCUIT_BREAKER_WINDOW = config("CIRCUIT_BREAKER_WINDOW", default=60, cast=int)
+CIRCUIT_BREAKER_TIMEOUT = config("CIRCUIT_BREAKER_TIMEOUT", default=60, cast=int)
+
+# provider metadata is served from cache until the soft TTL,
+# then served stale while refreshed in the background until the hard TTL
+METADATA_SOFT_TTL = config("METADATA_SOFT_TTL", default=18000, cast=int)  # 5 hours
+METADATA_HARD_TTL = config("METADATA_HARD_TTL", default=604800, cast=int)  # 7 days
+# seconds not found responses and empty searches are remembered (1 day)
+METADATA_NOT_FOUND_TTL = config("METADATA_NOT_FOUND_TTL", default=86400, cast=int)
+# per process copy of recently used metadata in front of redis
+METADATA_LOCAL_TTL = config("METADATA_LOCAL_TTL", default=60, cast=int)
+METADATA_LOCAL_SIZE = config("METADATA_LOCAL_SIZE", default=256, cast=int)
+# max concurrent provider requests when fetching metadata in bulk
+METADATA_FETCH_CONCURRENCY = config("METADATA_FETCH_CONCURRENCY", default=4, cast=int)
+# soft TTL of TMDB metadata, the TMDB changes task marks changed entries stale
+METADATA_TMDB_SOFT_TTL = config(
+    "METADATA_TMDB_SOFT_TTL",
+    default=60 * 60 * 24 * 3,  # 3 days
+    cast=int,
+)
+# keep a copy of the metadata in the database, restored when Redis loses it
+METADATA_SNAPSHOTS = config("METADATA_SNAPSHOTS", default=True, cast=bool)
+# serializer of the cached metadata, see app.providers.serializers
+METADATA_CACHE_SERIALIZER = config(
+    "METADATA_CACHE_SERIALIZER",
+    default="app.providers.serializers.JSONZlibSerializer",
+)
+
 TMDB_API = config("TMDB_API", default="61572be02f0a068658828f6396aacf60")
 TMDB_NSFW = config("TMDB_NSFW", default=False, cast=bool)
 TMDB_LANG = config("TMDB_LANG", default="en")
+# directory of the daily ID exports imported into the catalog
+TMDB_EXPORT_DIR = config("TMDB_EXPORT_DIR", default="")
 
 MAL_API = config("MAL_API", default="25b5581dafd15b3e7d583bb79e9a1691")
 MAL_NSFW = config("MAL_NSFW", default=False, cast=bool)
@@ -290,4 +361,16 @@ CELERY_BEAT_SCHEDULE = {
         "task": "Reload calendar",
         "schedule": 60 * 60 * 6,  # every 6 hours
     },
+    "sync_tmdb_changes": {
+        "task": "Sync TMDB changes",
+        "schedule": 60 * 60,  # every hour
+    },
+    "import_tmdb_exports": {
+        "task": "Import TMDB exports",
+        "schedule": 60 * 60 * 24,  # every day
+    },
+    "clean_image_cache": {
+        "task": "Clean image cache",
+        "schedule": 60 * 60 * 24,  # every day
+    },
 }
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -9,16 +10,18 @@ from django.db import transaction
 from django.db.models import Q
 
 from app.models import MEDIA_TYPES, Item
-from app.providers import services, tmdb
+from app.providers import services
+from config.celery import ProviderTask
 from events.models import Event
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_MONTH_DAY = "-01-01"
 DEFAULT_DAY = "-01"
+ANILIST_PER_PAGE = 50
 
 
-@shared_task(name="Reload calendar")
+@shared_task(base=ProviderTask, name="Reload calendar")
 def reload_calendar(user=None):  # , used for metadata
     """Refresh the calendar with latest dates for all users."""
     statuses = ["Planning", "In progress"]
@@ -41,17 +44,28 @@ def reload_calendar(user=None):  # , used for metadata
         Q(id__in=future_event_item_ids) | Q(id__in=items_without_events),
     )
 
-    events_bulk = []
+    # anime can later be processed in bulk
     anime_to_process = []
+    other_to_process = []
+    for item in items_to_process:
+        if item.media_type == "anime":
+            anime_to_process.append(item)
+        else:
+            other_to_process.append(item)
+
+    # fetch the metadata before locking the database
+    metadata_by_media = services.get_media_metadata_many(
+        [get_media_tuple(item) for item in other_to_process],
+    )
+
+    events_bulk = []
     user_reloaded_items = []
     with transaction.atomic():
         # Delete all events related to items with at least one future event
         Event.objects.filter(item_id__in=future_event_item_ids).delete()
-        for item in items_to_process:
-            # anime can later be processed in bulk
-            if item.media_type == "anime":
-                anime_to_process.append(item)
-            elif process_item(item, events_bulk):
+        for item in other_to_process:
+            metadata = metadata_by_media[get_media_tuple(item)]
+            if process_item(item, metadata, events_bulk):
                 add_user_reloaded(item, user, user_reloaded_items)
 
         # process anime items in bulk
@@ -70,29 +84,28 @@ def reload_calendar(user=None):  # , used for metadata
     return "There have been no changes in your calendar"
 
 
-def process_item(item, events_bulk):
+def get_media_tuple(item):
+    """Return the tuple identifying the metadata of an item."""
+    return (item.media_type, item.media_id, item.source, item.season_number)
+
+
+def process_item(item, metadata, events_bulk):
     """Process each item and add events to the event list."""
-    try:
-        if item.media_type == "season":
-            metadata = tmdb.season(item.media_id, item.season_number)
-            reloaded = process_season(item, metadata, events_bulk)
-        else:
-            metadata = services.get_media_metadata(
-                item.media_type,
-                item.media_id,
-                item.source,
-            )
-            reloaded = process_other(item, metadata, events_bulk)
-    except requests.exceptions.HTTPError as err:
+    if isinstance(metadata, Exception):
         # happens for niche media in which the mappings during import are incorrect
-        if err.response.status_code == requests.codes.not_found:
+        if (
+            isinstance(metadata, requests.exceptions.HTTPError)
+            and metadata.response.status_code == requests.codes.not_found
+        ):
             msg = f"{item} ({item.media_id}) not found on {item.source}. Deleting it."
             logger.warning(msg)
             item.delete()
-            reloaded = False
-        else:
-            raise
-    return reloaded
+            return False
+        raise metadata
+
+    if item.media_type == "season":
+        return process_season(item, metadata, events_bulk)
+    return process_other(item, metadata, events_bulk)
 
 
 def process_anime_bulk(items, events_bulk, user, user_reloaded_items):
@@ -117,13 +130,32 @@ def process_anime_bulk(items, events_bulk, user, user_reloaded_items):
 
 def get_anime_schedule_bulk(media_ids):
     """Get the airing schedule for multiple anime items from AniList API."""
+    return services.run_async(async_anime_schedule_bulk(media_ids))
+
+
+async def async_anime_schedule_bulk(media_ids):
+    """Request the airing schedules in pages of ids concurrently."""
+    chunks = [
+        media_ids[i : i + ANILIST_PER_PAGE]
+        for i in range(0, len(media_ids), ANILIST_PER_PAGE)
+    ]
+    results = await asyncio.gather(*(get_anime_schedule(chunk) for chunk in chunks))
+
+    all_data = {}
+    for result in results:
+        all_data.update(result)
+    return all_data
+
+
+async def get_anime_schedule(media_ids):
+    """Get the airing schedule for a page of anime items from AniList API."""
     all_data = {}
     page = 1
 
     while True:
         query = """
-        query ($ids: [Int], $page: Int) {
-          Page(page: $page) {
+        query ($ids: [Int], $page: Int, $perPage: Int) {
+          Page(page: $page, perPage: $perPage) {
             pageInfo {
               hasNextPage
             }
@@ -144,9 +176,9 @@ def get_anime_schedule_bulk(media_ids):
           }
         }
         """
-        variables = {"ids": media_ids, "page": page}
+        variables = {"ids": media_ids, "page": page, "perPage": ANILIST_PER_PAGE}
         url = "https://graphql.anilist.co"
-        response = services.api_request(
+        response = await services.async_api_request(
             "ANILIST",
             "POST",
             url,
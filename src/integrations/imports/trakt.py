@@ -496,7 +496,10 @@ def get_metadata(fetch_func, source, title, *args, **kwargs):
 
 def download_and_parse_anitrakt_db(url):
     """Download and parse the AniTrakt database."""
-    response = requests.get(url, timeout=settings.REQUEST_TIMEOUT)
+    response = requests.get(
+        app.providers.services.get_request_url(url),
+        timeout=settings.REQUEST_TIMEOUT,
+    )
     response.raise_for_status()
 
     soup = BeautifulSoup(response.text, "html.parser")
@@ -1,12 +1,13 @@
 import requests
 from celery import shared_task
 
+from config.celery import ProviderTask
 from integrations.imports import anilist, kitsu, mal, simkl, tmdb, trakt, yamtrack
 
 ERROR_TITLE = "\n\n\n Couldn't import the following media: \n\n"
 
 
-@shared_task(name="Import from Trakt")
+@shared_task(base=ProviderTask, name="Import from Trakt")
 def import_trakt(username, user):
     """Celery task for importing anime and manga data from Trakt."""
     (
@@ -27,7 +28,7 @@ def import_trakt(username, user):
     return info_message
 
 
-@shared_task(name="Import from SIMKL")
+@shared_task(base=ProviderTask, name="Import from SIMKL")
 def import_simkl(token, user):
     """Celery task for importing anime and manga data from SIMKL."""
     num_tv_imported, num_movie_imported, num_anime_imported, warning_message = (
@@ -47,7 +48,7 @@ def import_simkl(token, user):
     return info_message
 
 
-@shared_task(name="Import from MyAnimeList")
+@shared_task(base=ProviderTask, name="Import from MyAnimeList")
 def import_mal(username, user):
     """Celery task for importing anime and manga data from MyAnimeList."""
     try:
@@ -60,7 +61,7 @@ def import_mal(username, user):
     return f"Imported {num_anime_imported} anime and {num_manga_imported} manga."
 
 
-@shared_task(name="Import from TMDB")
+@shared_task(base=ProviderTask, name="Import from TMDB")
 def import_tmdb(file, user, status):
     """Celery task for importing TMDB tv shows and movies."""
     try:
@@ -74,7 +75,7 @@ def import_tmdb(file, user, status):
     return f"Imported {num_tv_imported} TV shows and {num_movie_imported} movies."
 
 
-@shared_task(name="Import from AniList")
+@shared_task(base=ProviderTask, name="Import from AniList")
 def import_anilist(username, user):
     """Celery task for importing anime and manga data from AniList."""
     try:
@@ -100,7 +101,7 @@ def import_anilist(username, user):
     return info_message
 
 
-@shared_task(name="Import from Kitsu by username")
+@shared_task(base=ProviderTask, name="Import from Kitsu by username")
 def import_kitsu_name(username, user):
     """Celery task for importing anime and manga data from Kitsu."""
     num_anime_imported, num_manga_imported, warning_message = kitsu.import_by_username(
@@ -116,7 +117,7 @@ def import_kitsu_name(username, user):
     return info_message
 
 
-@shared_task(name="Import from Kitsu by user ID")
+@shared_task(base=ProviderTask, name="Import from Kitsu by user ID")
 def import_kitsu_id(user_id, user):
     """Celery task for importing anime and manga data from Kitsu."""
     num_anime_imported, num_manga_imported, warning_message = kitsu.import_by_user_id(
@@ -132,7 +133,7 @@ def import_kitsu_id(user_id, user):
     return info_message
 
 
-@shared_task(name="Import from Yamtrack")
+@shared_task(base=ProviderTask, name="Import from Yamtrack")
 def import_yamtrack(file, user):
     """Celery task for importing media data from Yamtrack."""
     try:
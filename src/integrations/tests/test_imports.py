@@ -9,6 +9,8 @@ from django.contrib.auth import get_user_model
 from django.test import TestCase
 
 from app.models import TV, Anime, Episode, Item, Manga, Movie, Season
+from app.providers import ratelimit
+from integrations import tasks
 from integrations.imports import anilist, kitsu, mal, simkl, tmdb, trakt, yamtrack
 
 mock_path = Path(__file__).resolve().parent / "mock_data"
@@ -67,6 +69,19 @@ class ImportMAL(TestCase):
             self.user,
         )
 
+    @patch("integrations.imports.mal.importer")
+    def test_retry_when_rate_limited(self, mock_importer):
+        """Test that the import task is retried when MAL is rate limited."""
+        mock_importer.side_effect = [
+            ratelimit.RateLimitedError("api.myanimelist.net", 60),
+            (4, 2),
+        ]
+
+        result = tasks.import_mal.delay("bloodthirstiness", self.user)
+
+        self.assertEqual(result.get(), "Imported 4 anime and 2 manga.")
+        self.assertEqual(mock_importer.call_count, 2)
+
 
 class ImportTMDB(TestCase):
     """Test importing media from TMDB."""
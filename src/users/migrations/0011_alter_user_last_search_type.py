@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_alter_user_last_search_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='last_search_type',
+            field=models.CharField(choices=[('movie', 'movie'), ('tv', 'tv'), ('season', 'season'), ('episode', 'episode'), ('anime', 'anime'), ('manga', 'manga'), ('game', 'game'), ('all', 'all')], default='tv', max_length=10),
+        ),
+    ]
@@ -17,7 +17,7 @@ class User(AbstractUser):
     last_search_type = models.CharField(
         max_length=10,
         default="tv",
-        choices=[(media_type, media_type) for media_type in MEDIA_TYPES],
+        choices=[(media_type, media_type) for media_type in [*MEDIA_TYPES, "all"]],
     )
 
     tv_layout = models.CharField(